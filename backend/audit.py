@@ -0,0 +1,160 @@
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta
+
+from fastapi import Depends
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from . import models, partitions
+from .auth import get_current_admin_user
+from .database import SessionLocal, engine, get_db
+from .rollups import lock_state
+
+logger = logging.getLogger(__name__)
+
+ADMIN_LOG_RETENTION_DAYS = int(os.getenv("ADMIN_LOG_RETENTION_DAYS", "365"))
+ADMIN_LOG_COMPACTION_INTERVAL = float(os.getenv("ADMIN_LOG_COMPACTION_INTERVAL", "86400"))
+ADMIN_LOG_CHUNK_SIZE = int(os.getenv("ADMIN_LOG_CHUNK_SIZE", "10000"))
+# Monthly partitions are created this far ahead of time
+ADMIN_LOG_PARTITION_MONTHS_AHEAD = int(os.getenv("ADMIN_LOG_PARTITION_MONTHS_AHEAD", "3"))
+
+ADMIN_LOGS = "admin_logs"
+
+
+class AuditLog:
+    # Adds AdminLog rows to the request's session so they are committed (or
+    # rolled back) together with the change they describe.
+
+    def __init__(self, db: Session, user: models.User):
+        self.db = db
+        self.user = user
+
+    def record(self, action: str, details: dict = None):
+        self.db.add(models.AdminLog(user_id=self.user.id, action=action, details=details))
+
+
+def admin_audit_log(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+) -> AuditLog:
+    return AuditLog(db, current_user)
+
+
+def _summarize(db: Session, cutoff: datetime) -> int:
+    # Fold raw logs older than `cutoff` into daily counts, in id order, moving
+    # the watermark in the same transaction as the counts it covers
+    summarized = 0
+    while True:
+        state = lock_state(db, ADMIN_LOGS)
+        ids = db.query(models.AdminLog.id).filter(
+            models.AdminLog.id > state.last_id,
+            models.AdminLog.created_at < cutoff
+        ).order_by(models.AdminLog.id).limit(ADMIN_LOG_CHUNK_SIZE).subquery()
+        upto_id = db.query(func.max(ids.c.id)).scalar()
+        if upto_id is None:
+            db.rollback()
+            return summarized
+
+        dims = (
+            func.date(models.AdminLog.created_at),
+            func.coalesce(models.AdminLog.user_id, 0),
+            func.coalesce(models.AdminLog.action, ""),
+        )
+        counts = db.query(
+            *dims,
+            func.count(models.AdminLog.id)
+        ).filter(
+            models.AdminLog.id > state.last_id,
+            models.AdminLog.id <= upto_id,
+            models.AdminLog.created_at < cutoff
+        ).group_by(*dims).all()
+
+        rows = [
+            {"day": log_day, "user_id": user_id, "action": action, "actions": count}
+            for log_day, user_id, action, count in counts
+        ]
+        if rows:
+            upsert = mysql_insert(models.AdminLogSummary).values(rows)
+            upsert = upsert.on_duplicate_key_update(
+                actions=models.AdminLogSummary.actions + upsert.inserted.actions
+            )
+            db.execute(upsert)
+
+        state.last_id = upto_id
+        db.commit()
+        summarized += sum(row["actions"] for row in rows)
+
+
+def _delete_summarized(db: Session, cutoff: datetime) -> int:
+    # Fallback for unpartitioned tables: small chunks keep locks short
+    state = db.query(models.RollupState).filter(models.RollupState.name == ADMIN_LOGS).first()
+    if state is None:
+        return 0
+    deleted = 0
+    while True:
+        ids = [row.id for row in db.query(models.AdminLog.id).filter(
+            models.AdminLog.id <= state.last_id,
+            models.AdminLog.created_at < cutoff
+        ).order_by(models.AdminLog.id).limit(ADMIN_LOG_CHUNK_SIZE).all()]
+        if not ids:
+            return deleted
+        db.query(models.AdminLog).filter(models.AdminLog.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+
+
+def compact_admin_logs(now: datetime = None) -> dict:
+    now = now or datetime.utcnow()
+    cutoff = datetime.combine(now.date() - timedelta(days=ADMIN_LOG_RETENTION_DAYS), datetime.min.time())
+
+    with engine.connect() as conn:
+        partitioned = partitions.is_partitioned(conn, ADMIN_LOGS)
+        if partitioned:
+            created = partitions.ensure_future_partitions(
+                conn, ADMIN_LOGS, (now + timedelta(days=31 * ADMIN_LOG_PARTITION_MONTHS_AHEAD)).date()
+            )
+            if created:
+                logger.info(f"Created admin_logs partitions: {', '.join(created)}")
+            expired = partitions.partitions_before(conn, ADMIN_LOGS, cutoff.date())
+            # Whole partitions only: rows in a partially expired month wait for the next run
+            partition_cutoff = partitions.droppable_cutoff(expired)
+            if partition_cutoff is None:
+                return {"summarized": 0, "dropped_partitions": [], "deleted": 0}
+            cutoff = datetime.combine(partition_cutoff, datetime.min.time())
+
+    db = SessionLocal()
+    try:
+        summarized = _summarize(db, cutoff)
+        deleted = 0 if partitioned else _delete_summarized(db, cutoff)
+    finally:
+        db.close()
+
+    dropped = []
+    if partitioned:
+        # DDL commits implicitly, so it only runs once the summaries are committed
+        dropped = [p.name for p in expired]
+        with engine.connect() as conn:
+            partitions.drop_partitions(conn, ADMIN_LOGS, dropped)
+
+    logger.info(
+        f"Compacted admin logs before {cutoff.date()}: {summarized} summarized, "
+        f"{len(dropped)} partitions dropped, {deleted} rows deleted"
+    )
+    return {"summarized": summarized, "dropped_partitions": dropped, "deleted": deleted}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Admin log retention")
+    parser.add_argument("command", choices=["compact"])
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    models.Base.metadata.create_all(bind=engine)
+    print(compact_admin_logs())
+
+
+if __name__ == "__main__":
+    main()
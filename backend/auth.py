@@ -4,14 +4,21 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 from . import models, schemas
-from .database import get_db
+from .cache import LRUCache
+from .database import get_db, get_async_db
+from .ratelimit import rate_limiter
+import asyncio
+import math
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 import secrets
 
 load_dotenv()
@@ -23,14 +30,18 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 MAX_LOGIN_ATTEMPTS = 5
 LOGIN_TIMEOUT_MINUTES = 15
+# Off by default: anyone who knows an email address could keep that account
+# locked out. Failed logins still block the client IP (security.require_unblocked_ip).
+LOGIN_ACCOUNT_LOCKOUT = os.getenv("LOGIN_ACCOUNT_LOCKOUT", "false").lower() == "true"
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1000"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "16"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 security = HTTPBearer()
 
-# Rate limiting
-limiter = Limiter(key_func=get_remote_address)
-
 # CSRF protection
 csrf_token_header = "X-CSRF-Token"
 
@@ -52,6 +63,54 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordHasherPool:
+    # bcrypt releases the GIL, so a small thread pool keeps hashing off the
+    # event loop; `workers` caps concurrent hashes, `queue_limit` caps waiters.
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, func, *args):
+        # Only touched from the event loop thread, so no lock is needed
+        if self._pending >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts in progress, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            self.completed += 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+password_hasher = PasswordHasherPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hasher.run(pwd_context.verify, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_hasher.run(pwd_context.hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -69,33 +128,110 @@ def create_refresh_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Verified principals keyed by access token, so authenticated requests can
+# skip the users lookup. Entries never outlive the token itself.
+_principal_cache = LRUCache(PRINCIPAL_CACHE_SIZE)
+_principal_tokens = {}
+_principal_lock = threading.Lock()
+PRINCIPAL_FIELDS = ("id", "email", "is_active", "is_admin", "created_at", "updated_at")
+
+def cache_principal(token: str, payload: dict, user: models.User):
+    ttl = min(PRINCIPAL_CACHE_TTL_SECONDS, payload.get("exp", 0) - time.time())
+    if ttl <= 0:
+        return
+    _principal_cache.set(token, {field: getattr(user, field) for field in PRINCIPAL_FIELDS}, ttl=ttl)
+    with _principal_lock:
+        tokens = {t for t in _principal_tokens.get(user.email, ()) if t in _principal_cache}
+        tokens.add(token)
+        _principal_tokens[user.email] = tokens
+
+def get_cached_principal(token: str) -> Optional[models.User]:
+    principal = _principal_cache.get(token)
+    if principal is None:
+        return None
+    # A fresh transient instance per request; it is never attached to a
+    # session, so only use it for its column values (e.g. user_id=current_user.id)
+    return models.User(**principal)
+
+def invalidate_principal(email: str):
+    with _principal_lock:
+        tokens = _principal_tokens.pop(email, ())
+    for token in tokens:
+        _principal_cache.pop(token)
+
+def principal_cache_stats() -> dict:
+    return _principal_cache.stats()
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _collect_changed_user(mapper, connection, target):
+    # Covers deactivation, demotion, password and email changes. Evicted on
+    # commit: evicting at flush would let a concurrent request re-cache the
+    # old row before the change is visible.
+    session = object_session(target)
+    if session is None:
+        return
+    history = inspect(target).attrs.email.history
+    emails = session.info.setdefault("principal_evictions", set())
+    emails.update(email for email in set(history.deleted or ()) | {target.email} if email)
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed_users(session):
+    for email in session.info.pop("principal_evictions", ()):
+        invalidate_principal(email)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop("principal_evictions", None)
+
 def get_user(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-@limiter.limit(f"{MAX_LOGIN_ATTEMPTS}/minute")
+async def get_user_async(db: AsyncSession, email: str) -> Optional[models.User]:
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
 async def authenticate_user(
     email: str,
     password: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Optional[models.User]:
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user:
-        return None
-    if not verify_password(password, user.hashed_password):
+    # Optional per-account lockout after MAX_LOGIN_ATTEMPTS failures, shared by all workers
+    account = f"login:{email.lower()}"
+    if LOGIN_ACCOUNT_LOCKOUT:
+        blocked_for = await rate_limiter.run(rate_limiter.blocked_for, account)
+        if blocked_for:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed login attempts, try again later",
+                headers={"Retry-After": str(math.ceil(blocked_for))},
+            )
+    
+    user = await get_user_async(db, email)
+    if not user or not await verify_password_async(password, user.hashed_password):
+        if LOGIN_ACCOUNT_LOCKOUT:
+            lockout = LOGIN_TIMEOUT_MINUTES * 60
+            await rate_limiter.run(rate_limiter.record_failure, account, MAX_LOGIN_ATTEMPTS, lockout, lockout)
         return None
+    if LOGIN_ACCOUNT_LOCKOUT:
+        await rate_limiter.run(rate_limiter.clear_failures, account)
     return user
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> models.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    token = credentials.credentials
+    user = get_cached_principal(token)
+    if user is not None:
+        return user
+    
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
@@ -104,9 +240,10 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+    user = await get_user_async(db, token_data.email)
     if user is None:
         raise credentials_exception
+    cache_principal(token, payload, user)
     return user
 
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
@@ -143,7 +280,7 @@ def create_tokens(user: models.User) -> Token:
 
 async def refresh_access_token(
     refresh_token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Token:
     try:
         payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -153,7 +290,7 @@ async def refresh_access_token(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token"
             )
-        user = db.query(models.User).filter(models.User.email == email).first()
+        user = await get_user_async(db, email)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
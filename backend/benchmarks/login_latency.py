@@ -0,0 +1,92 @@
+# Measures latency of an unrelated endpoint while bcrypt logins are running,
+# with verification inline on the event loop vs. on the password hasher pool.
+#
+#   python -m backend.benchmarks.login_latency --logins 20 --pings 200
+#
+# Requires httpx (for the in-process ASGI client).
+import argparse
+import asyncio
+import statistics
+
+import httpx
+from fastapi import FastAPI
+
+from ..auth import PasswordHasherPool, pwd_context
+
+PASSWORD = "benchmark-password"
+PING_INTERVAL = 0.005
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build_app(hashed: str, pool: PasswordHasherPool = None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/login")
+    async def login():
+        if pool is None:
+            ok = pwd_context.verify(PASSWORD, hashed)
+        else:
+            ok = await pool.run(pwd_context.verify, PASSWORD, hashed)
+        return {"ok": ok}
+
+    return app
+
+
+async def measure(app: FastAPI, logins: int, pings: int) -> list:
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def pinger():
+            # Pings are scheduled at a fixed rate and timed from when they were
+            # due, so time spent waiting for a blocked event loop is counted.
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            for i in range(pings):
+                due = started + i * PING_INTERVAL
+                await asyncio.sleep(max(0, due - loop.time()))
+                await client.get("/ping")
+                latencies.append((loop.time() - due) * 1000)
+
+        await asyncio.gather(pinger(), *[client.post("/login") for _ in range(logins)])
+    return latencies
+
+
+def report(label: str, latencies: list):
+    print(
+        f"{label:<10} pings={len(latencies):<5} "
+        f"p50={statistics.median(latencies):8.2f}ms "
+        f"p99={_percentile(latencies, 99):8.2f}ms "
+        f"max={max(latencies):8.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endpoint latency under concurrent logins")
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--pings", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash(PASSWORD)
+    print(f"{args.logins} concurrent logins, /ping latency:")
+
+    report("inline", asyncio.run(measure(build_app(hashed), args.logins, args.pings)))
+
+    pool = PasswordHasherPool(args.workers, queue_limit=args.logins)
+    try:
+        report("offloaded", asyncio.run(measure(build_app(hashed, pool), args.logins, args.pings)))
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
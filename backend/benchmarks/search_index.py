@@ -0,0 +1,111 @@
+# Builds the search index over a synthetic corpus and measures query latency
+# against a substring scan (what LIKE '%term%' does on every row).
+#
+#   python -m backend.benchmarks.search_index --documents 100000 --queries 500
+import argparse
+import random
+import statistics
+import string
+import time
+
+from ..search import SEARCH_TYPES, SearchIndex
+
+SECTIONS = ["about", "admissions", "campus", "research", "alumni"]
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))))
+    return sorted(words)
+
+
+def make_corpus(documents: int, vocabulary: list, rng: random.Random) -> list:
+    # Zipf-like word frequencies so a few terms are very common, most are rare
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    corpus = []
+    for doc_id in range(documents):
+        doc_type = SEARCH_TYPES[doc_id % len(SEARCH_TYPES)]
+        title = " ".join(rng.choices(vocabulary, weights, k=rng.randint(3, 8)))
+        body = " ".join(rng.choices(vocabulary, weights, k=rng.randint(50, 300)))
+        section = rng.choice(SECTIONS) if doc_type == "content" else None
+        corpus.append(((doc_type, doc_id), title, body, section))
+    return corpus
+
+
+def time_queries(search, queries: list) -> list:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: list):
+    print(
+        f"{label:<22} queries={len(latencies):<5} "
+        f"p50={statistics.median(latencies):9.3f}ms "
+        f"p99={_percentile(latencies, 99):9.3f}ms "
+        f"max={max(latencies):9.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search index build and query benchmark")
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--scan-queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    corpus = make_corpus(args.documents, vocabulary, rng)
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    for key, title, body, section in corpus:
+        index.add(key, title, body, section)
+    build_seconds = time.perf_counter() - start
+    stats = index.stats()
+    print(
+        f"built {stats['documents']} documents / {stats['terms']} terms "
+        f"in {build_seconds:.1f}s ({stats['documents'] / build_seconds:.0f} docs/s)"
+    )
+
+    # Incremental update: re-index existing documents as an admin edit would
+    start = time.perf_counter()
+    for key, title, body, section in rng.sample(corpus, 1000):
+        index.add(key, title, body + " edited", section)
+    print(f"incremental update     {(time.perf_counter() - start) * 1000 / 1000:.3f}ms per document")
+
+    def pick(count):
+        return [rng.choice(vocabulary) for _ in range(count)]
+
+    single = pick(args.queries)
+    multi = [" ".join(pick(rng.randint(2, 4))) for _ in range(args.queries)]
+    prefixes = [word[:3] for word in pick(args.queries)]
+
+    report("single term", time_queries(lambda q: index.search(q, prefix=False), single))
+    report("multi term", time_queries(lambda q: index.search(q, prefix=False), multi))
+    report("prefix", time_queries(index.search, prefixes))
+    report("multi term + section", time_queries(
+        lambda q: index.search(q, types={"content"}, section="campus", prefix=False), multi
+    ))
+
+    bodies = [(title + " " + body).lower() for _, title, body, _ in corpus]
+    report("substring scan", time_queries(
+        lambda q: [i for i, text in enumerate(bodies) if q in text], single[:args.scan_queries]
+    ))
+
+
+if __name__ == "__main__":
+    main()
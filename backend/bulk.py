@@ -0,0 +1,177 @@
+import csv
+import io
+import json
+import os
+from collections import namedtuple
+
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models, schemas, search
+from .audit import AuditLog
+
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "5000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+BulkEntity = namedtuple("BulkEntity", ["model", "schema"])
+
+ENTITIES = {
+    "content": BulkEntity(models.Content, schemas.ContentCreate),
+    "events": BulkEntity(models.Event, schemas.EventCreate),
+    "courses": BulkEntity(models.Course, schemas.CourseCreate),
+    "departments": BulkEntity(models.Department, schemas.DepartmentCreate),
+    "faqs": BulkEntity(models.FAQ, schemas.FAQCreate),
+}
+
+
+def entity(name: str) -> BulkEntity:
+    if name not in ENTITIES:
+        raise HTTPException(status_code=404, detail="Unknown bulk entity")
+    return ENTITIES[name]
+
+
+def _parse_csv(text: str) -> list:
+    # Empty cells mean "not given", so schema defaults still apply
+    return [
+        {key: value for key, value in row.items() if key and value != ""}
+        for row in csv.DictReader(io.StringIO(text))
+    ]
+
+
+async def bulk_rows(request: Request) -> list:
+    # A JSON array, a text/csv body, or a multipart upload in a "file" field
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Expected a CSV file in the 'file' field")
+            rows = _parse_csv((await upload.read()).decode("utf-8-sig"))
+        elif content_type.startswith("text/csv"):
+            rows = _parse_csv((await request.body()).decode("utf-8-sig"))
+        else:
+            rows = await request.json()
+    except (UnicodeDecodeError, json.JSONDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse bulk payload: {str(e)}")
+
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a list of rows")
+    if not rows:
+        raise HTTPException(status_code=400, detail="No rows given")
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ROWS} rows per request"
+        )
+    return rows
+
+
+class _IdRow(BaseModel):
+    id: int
+
+
+def _validate(rows: list, schema, with_id: bool = False) -> list:
+    # Every row is checked before anything is written; all errors are
+    # reported together with their row number
+    values, errors = [], []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"row": index, "errors": "Expected an object"})
+            continue
+        try:
+            value = schema.model_validate(row).model_dump()
+            if with_id:
+                value["id"] = _IdRow.model_validate(row).id
+            values.append(value)
+        except ValidationError as e:
+            errors.append({"row": index, "errors": e.errors(include_url=False, include_context=False)})
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return values
+
+
+def _ids(rows: list) -> list:
+    # Deletes take bare ids or objects/CSV rows with an id column
+    rows = [row if isinstance(row, dict) else {"id": row} for row in rows]
+    return [value["id"] for value in _validate(rows, _IdRow)]
+
+
+def _chunks(items: list):
+    for start in range(0, len(items), BULK_CHUNK_SIZE):
+        yield items[start:start + BULK_CHUNK_SIZE]
+
+
+def _require_existing(db: Session, model, ids: list):
+    duplicates = len(ids) != len(set(ids))
+    if duplicates:
+        raise HTTPException(status_code=400, detail="Duplicate ids in bulk request")
+    found = set()
+    for chunk in _chunks(ids):
+        found.update(row.id for row in db.query(model.id).filter(model.id.in_(chunk)))
+    missing = sorted(set(ids) - found)
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Rows not found", "ids": missing})
+
+
+def _conflict(db: Session, error: IntegrityError) -> HTTPException:
+    # e.g. a duplicate content slug; nothing from the batch is kept
+    db.rollback()
+    return HTTPException(status_code=409, detail=f"Bulk write conflicts with existing rows: {str(error.orig)}")
+
+
+def bulk_create(db: Session, audit_log: AuditLog, name: str, rows: list) -> dict:
+    model, schema = entity(name)
+    values = _validate(rows, schema)
+
+    # Multi-row INSERTs give no ids back on MySQL; everything above the
+    # current max id is reindexed after commit instead
+    max_id = db.query(func.max(model.id)).scalar() or 0
+    try:
+        for chunk in _chunks(values):
+            db.execute(insert(model).values(chunk))
+        audit_log.record(f"bulk_create_{name}", {"count": len(values)})
+        db.commit()
+    except IntegrityError as e:
+        raise _conflict(db, e)
+
+    new_ids = [row.id for row in db.query(model.id).filter(model.id > max_id)]
+    search.search_index.reindex(db, model, new_ids)
+    return {"created": len(values)}
+
+
+def bulk_update(db: Session, audit_log: AuditLog, name: str, rows: list) -> dict:
+    model, schema = entity(name)
+    values = _validate(rows, schema, with_id=True)
+    ids = [value["id"] for value in values]
+    _require_existing(db, model, ids)
+
+    # UPDATE ... WHERE id = ? sent as one executemany per chunk
+    try:
+        for chunk in _chunks(values):
+            db.execute(update(model), chunk)
+        audit_log.record(f"bulk_update_{name}", {"count": len(ids), "ids": ids})
+        db.commit()
+    except IntegrityError as e:
+        raise _conflict(db, e)
+
+    search.search_index.reindex(db, model, ids)
+    return {"updated": len(ids)}
+
+
+def bulk_delete(db: Session, audit_log: AuditLog, name: str, rows: list) -> dict:
+    model, _ = entity(name)
+    ids = _ids(rows)
+    _require_existing(db, model, ids)
+
+    for chunk in _chunks(ids):
+        db.execute(delete(model).where(model.id.in_(chunk)).execution_options(synchronize_session=False))
+
+    audit_log.record(f"bulk_delete_{name}", {"count": len(ids), "ids": ids})
+    db.commit()
+
+    search.search_index.reindex(db, model, ids)
+    return {"deleted": len(ids)}
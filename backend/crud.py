@@ -0,0 +1,127 @@
+from typing import Type
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import audit, models, pagination, search
+from .auth import get_current_admin_user
+from .database import get_db
+
+
+class Repository:
+    # Single-statement writes: updates and deletes are one UPDATE/DELETE ...
+    # WHERE id = ? with the rowcount telling whether the row existed, instead
+    # of a SELECT to load the object first.
+
+    def __init__(self, model, name: str):
+        self.model = model
+        self.name = name
+        self.label = model.__name__
+
+    def _not_found(self) -> HTTPException:
+        return HTTPException(status_code=404, detail=f"{self.label} not found")
+
+    def _conflict(self, db: Session, error: IntegrityError) -> HTTPException:
+        db.rollback()
+        return HTTPException(status_code=409, detail=f"{self.label} conflicts with an existing row: {str(error.orig)}")
+
+    def get(self, db: Session, item_id: int):
+        item = db.get(self.model, item_id)
+        if item is None:
+            raise self._not_found()
+        return item
+
+    def create(self, db: Session, audit_log: audit.AuditLog, values: dict):
+        item = self.model(**values)
+        db.add(item)
+        try:
+            db.flush()
+            # Log admin action in the same transaction
+            audit_log.record(f"create_{self.name}", {f"{self.name}_id": item.id})
+            db.commit()
+        except IntegrityError as e:
+            raise self._conflict(db, e)
+        db.refresh(item)
+        return item
+
+    def update(self, db: Session, audit_log: audit.AuditLog, item_id: int, values: dict):
+        try:
+            result = db.execute(
+                update(self.model).where(self.model.id == item_id).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                db.rollback()
+                raise self._not_found()
+            audit_log.record(f"update_{self.name}", {f"{self.name}_id": item_id})
+            db.commit()
+        except IntegrityError as e:
+            raise self._conflict(db, e)
+        # UPDATE statements skip the search index's flush hooks
+        search.search_index.reindex(db, self.model, [item_id])
+        return self.get(db, item_id)
+
+    def delete(self, db: Session, audit_log: audit.AuditLog, item_id: int):
+        result = db.execute(
+            delete(self.model).where(self.model.id == item_id)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.rollback()
+            raise self._not_found()
+        audit_log.record(f"delete_{self.name}", {f"{self.name}_id": item_id})
+        db.commit()
+        search.search_index.reindex(db, self.model, [item_id])
+
+
+def crud_router(model, schema: Type[BaseModel], create_schema: Type[BaseModel], path: str, name: str) -> APIRouter:
+    # Admin list/get/create/update/delete routes under /api/admin/{path}
+    repository = Repository(model, name)
+    router = APIRouter(prefix=f"/api/admin/{path}")
+
+    @router.get("", response_model=pagination.page_model(schema), response_model_exclude_unset=True)
+    def list_items(
+        page: pagination.PageParams = Depends(pagination.page_params),
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(get_current_admin_user)
+    ):
+        return pagination.paginate(db, model, schema, page)
+
+    @router.get("/{item_id}", response_model=schema)
+    def get_item(
+        item_id: int,
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(get_current_admin_user)
+    ):
+        return repository.get(db, item_id)
+
+    @router.post("", response_model=schema)
+    def create_item(
+        payload: create_schema,
+        db: Session = Depends(get_db),
+        audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
+    ):
+        return repository.create(db, audit_log, payload.model_dump())
+
+    @router.put("/{item_id}", response_model=schema)
+    def update_item(
+        item_id: int,
+        payload: create_schema,
+        db: Session = Depends(get_db),
+        audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
+    ):
+        return repository.update(db, audit_log, item_id, payload.model_dump())
+
+    @router.delete("/{item_id}")
+    def delete_item(
+        item_id: int,
+        db: Session = Depends(get_db),
+        audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
+    ):
+        repository.delete(db, audit_log, item_id)
+        return {"message": f"{repository.label} deleted successfully"}
+
+    return router
@@ -0,0 +1,84 @@
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .project_views import view_counter
+from .cache import LRUCache
+
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "30"))
+DASHBOARD_TREND_DAYS = 7
+
+_cache = LRUCache(1, ttl=DASHBOARD_CACHE_TTL_SECONDS)
+_build_lock = threading.Lock()
+
+
+def _day_key(day) -> str:
+    # func.date() gives a date on MySQL and a string on SQLite
+    return day.isoformat() if isinstance(day, date) else str(day)
+
+
+def _daily_counts(db: Session, column, since: datetime) -> dict:
+    # One grouped query per table covers both today's figure and the trend
+    day = func.date(column)
+    rows = db.query(day, func.count()).filter(column >= since).group_by(day).all()
+    return {_day_key(row_day): count for row_day, count in rows}
+
+
+def build_widgets(db: Session, now: datetime = None) -> dict:
+    now = now or datetime.utcnow()
+    today = now.date()
+    days = [today - timedelta(days=i) for i in range(DASHBOARD_TREND_DAYS - 1, -1, -1)]
+    since = datetime.combine(days[0], datetime.min.time())
+
+    visitors = _daily_counts(db, models.VisitorSession.first_visit, since)
+    page_views = _daily_counts(db, models.PageView.created_at, since)
+    contacts = _daily_counts(db, models.Contact.created_at, since)
+
+    recent_activities = db.query(models.AdminLog).order_by(
+        models.AdminLog.created_at.desc()
+    ).limit(10).all()
+
+    today_key = today.isoformat()
+    return {
+        "today_stats": {
+            "visitors": visitors.get(today_key, 0),
+            "page_views": page_views.get(today_key, 0),
+            "contacts": contacts.get(today_key, 0)
+        },
+        "visitor_trends": [
+            {"date": day.isoformat(), "count": visitors.get(day.isoformat(), 0)}
+            for day in days
+        ],
+        # Includes views counted in memory but not yet flushed
+        "top_projects": view_counter.top(5),
+        "recent_activities": [
+            {
+                "id": activity.id,
+                "action": activity.action,
+                "details": activity.details,
+                "created_at": activity.created_at.isoformat() if activity.created_at else None
+            }
+            for activity in recent_activities
+        ]
+    }
+
+
+def dashboard_widgets(db: Session) -> dict:
+    # Shared by every admin for DASHBOARD_CACHE_TTL_SECONDS; concurrent
+    # requests at expiry wait for one rebuild instead of each querying
+    widgets = _cache.get("widgets")
+    if widgets is None:
+        with _build_lock:
+            widgets = _cache.get("widgets")
+            if widgets is None:
+                widgets = build_widgets(db)
+                _cache.set("widgets", widgets)
+    return widgets
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
@@ -1,8 +1,10 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
+from .db_pool import PoolMetrics, instrument, instrumented_pool_class, pool_settings
 
 load_dotenv()
 
@@ -13,20 +15,66 @@ MYSQL_PORT = os.getenv("MYSQL_PORT", "3306")
 MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "portfolio_db")
 
 SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+# Override to point the async path elsewhere, e.g. sqlite+aiosqlite:///./test.db in tests
+ASYNC_SQLALCHEMY_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+)
+
+POOL_SETTINGS = pool_settings()
+sync_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+def _engine_options(metrics: PoolMetrics, is_async: bool = False) -> dict:
+    return {
+        "poolclass": instrumented_pool_class(metrics, is_async=is_async),
+        "pool_size": POOL_SETTINGS["pool_size"],
+        "max_overflow": POOL_SETTINGS["max_overflow"],
+        "pool_timeout": POOL_SETTINGS["pool_timeout"],
+        "pool_recycle": POOL_SETTINGS["pool_recycle"],
+        "pool_pre_ping": POOL_SETTINGS["pre_ping"] == "always",
+    }
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
+    **_engine_options(sync_pool_metrics),
 )
+instrument(engine, sync_pool_metrics, POOL_SETTINGS["pre_ping"], POOL_SETTINGS["ping_idle_seconds"])
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Non-blocking path for async endpoints and dependencies. The sync engine
+# above stays for def endpoints, init_db.py and the maintenance scripts.
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    **_engine_options(async_pool_metrics, is_async=True),
+)
+instrument(async_engine, async_pool_metrics, POOL_SETTINGS["pre_ping"], POOL_SETTINGS["ping_idle_seconds"])
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
+def pool_status() -> dict:
+    return {
+        "pid": os.getpid(),
+        "settings": POOL_SETTINGS,
+        "sync": sync_pool_metrics.snapshot(engine.pool),
+        "async": async_pool_metrics.snapshot(async_engine.pool),
+    }
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Pre-ping strategies:
+#   always - ping on every checkout (SQLAlchemy's pool_pre_ping)
+#   idle   - ping only connections that sat unused for DB_POOL_PING_IDLE_SECONDS
+#   never  - rely on pool_recycle and reconnect-on-error
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def pool_settings() -> dict:
+    # DB_TOTAL_CONNECTIONS is the budget for the whole server; each uvicorn
+    # worker (WEB_CONCURRENCY) gets an equal share unless DB_POOL_SIZE is set.
+    workers = max(1, _env_int("WEB_CONCURRENCY", 1))
+    total = _env_int("DB_TOTAL_CONNECTIONS", 0)
+    default_size = max(1, total // workers) if total else 5
+
+    strategy = os.getenv("DB_POOL_PRE_PING", "idle").lower()
+    if strategy not in PRE_PING_STRATEGIES:
+        raise ValueError(f"DB_POOL_PRE_PING must be one of {', '.join(PRE_PING_STRATEGIES)}")
+
+    return {
+        "pool_size": _env_int("DB_POOL_SIZE", default_size),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 0 if total else 10),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 3600),
+        "pre_ping": strategy,
+        "ping_idle_seconds": _env_int("DB_POOL_PING_IDLE_SECONDS", 30),
+    }
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.pings = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def incr(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool) -> dict:
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "closes": self.closes,
+            "invalidations": self.invalidations,
+            "pings": self.pings,
+            "ping_failures": self.ping_failures,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+        }
+
+
+class _TimedCheckout:
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.incr("timeouts")
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - start)
+
+
+def instrumented_pool_class(metrics: PoolMetrics, is_async: bool = False):
+    # A subclass per engine so the metrics survive pool.recreate() on dispose
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    return type(f"Instrumented{base.__name__}", (_TimedCheckout, base), {"metrics": metrics})
+
+
+def instrument(engine, metrics: PoolMetrics, pre_ping: str, ping_idle_seconds: int):
+    target = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(target, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.incr("connects")
+        connection_record.info["last_checkin"] = time.monotonic()
+
+    @event.listens_for(target, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.incr("checkouts")
+        if pre_ping != "idle":
+            return
+        idle_for = time.monotonic() - connection_record.info.get("last_checkin", 0)
+        if idle_for < ping_idle_seconds:
+            return
+        metrics.incr("pings")
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        except Exception:
+            metrics.incr("ping_failures")
+            # The pool discards this connection and retries with a fresh one
+            raise exc.DisconnectionError()
+
+    @event.listens_for(target, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.incr("checkins")
+        connection_record.info["last_checkin"] = time.monotonic()
+
+    @event.listens_for(target, "close")
+    def on_close(dbapi_connection, connection_record):
+        metrics.incr("closes")
+
+    @event.listens_for(target, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.incr("invalidations")
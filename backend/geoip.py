@@ -0,0 +1,101 @@
+import ipaddress
+import logging
+import os
+import threading
+
+import geoip2.database
+from geoip2.errors import AddressNotFoundError
+from maxminddb import MODE_MMAP
+
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+GEOIP_DATABASE = os.getenv("GEOIP_DATABASE", "GeoLite2-City.mmdb")
+GEOIP_CACHE_SIZE = int(os.getenv("GEOIP_CACHE_SIZE", "50000"))
+# Cache by network (/24 for IPv4, /48 for IPv6) instead of by exact address
+GEOIP_CACHE_BY_PREFIX = os.getenv("GEOIP_CACHE_BY_PREFIX", "true").lower() == "true"
+GEOIP_RELOAD_INTERVAL = float(os.getenv("GEOIP_RELOAD_INTERVAL", "300"))
+
+
+class GeoIPResolver:
+    def __init__(self, path: str, cache_size: int, by_prefix: bool = True):
+        self.path = path
+        self.by_prefix = by_prefix
+        self.cache = LRUCache(cache_size)
+        self.reloads = 0
+        self._reader = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime
+                reader = geoip2.database.Reader(self.path, mode=MODE_MMAP)
+            except FileNotFoundError:
+                logger.warning(f"GeoIP database {self.path} not found, locations will not be recorded")
+                reader, mtime = None, None
+            # The previous reader is not closed explicitly: a lookup running on
+            # another thread may still hold it, and it is released once unused.
+            self._reader = reader
+            self._mtime = mtime
+            self.cache.clear()
+
+    def close(self):
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+            self._reader = None
+            self._mtime = None
+            self.cache.clear()
+
+    def reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._mtime:
+            logger.info(f"GeoIP database {self.path} changed, reloading")
+            self.open()
+            self.reloads += 1
+
+    def _cache_key(self, ip: str):
+        address = ipaddress.ip_address(ip)
+        if not self.by_prefix:
+            return address
+        prefix = 24 if address.version == 4 else 48
+        return ipaddress.ip_network(f"{address}/{prefix}", strict=False)
+
+    def lookup(self, ip: str):
+        reader = self._reader
+        if reader is None:
+            return None, None
+        try:
+            key = self._cache_key(ip)
+        except ValueError:
+            return None, None
+
+        location = self.cache.get(key)
+        if location is None:
+            try:
+                city = reader.city(ip)
+                location = (city.country.name, city.city.name)
+            except (AddressNotFoundError, ValueError):
+                location = (None, None)
+            self.cache.set(key, location)
+        return location
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self._reader is not None,
+            "reloads": self.reloads,
+            "cache": self.cache.stats(),
+        }
+
+
+resolver = GeoIPResolver(
+    GEOIP_DATABASE,
+    cache_size=GEOIP_CACHE_SIZE,
+    by_prefix=GEOIP_CACHE_BY_PREFIX,
+)
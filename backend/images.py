@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANT_WIDTHS = [int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",")]
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tif", ".tiff"}
+UPLOADS_URL_PREFIX = "/uploads/"
+
+_executor = None
+_pending = set()
+
+
+def variant_formats() -> list:
+    # AVIF is only produced when the installed Pillow has an encoder for it
+    Image.init()
+    formats = ["webp"]
+    if "AVIF" in Image.SAVE:
+        formats.append("avif")
+    return formats
+
+
+def _variant_path(base: str, width: int, fmt: str) -> str:
+    return f"{base}_w{width}.{fmt}"
+
+
+def is_image(path: str) -> bool:
+    return os.path.splitext(path or "")[1].lower() in IMAGE_EXTENSIONS
+
+
+def variant_map(url: Optional[str]) -> Optional[dict]:
+    # Variant URLs are derived from the original's URL, so they can be
+    # returned before the background job has written them.
+    if not url or not url.startswith(UPLOADS_URL_PREFIX) or not is_image(url):
+        return None
+    base = os.path.splitext(url)[0]
+    return {
+        fmt: {str(width): _variant_path(base, width, fmt) for width in IMAGE_VARIANT_WIDTHS}
+        for fmt in variant_formats()
+    }
+
+
+def local_path(url: Optional[str], upload_dir: str) -> Optional[str]:
+    # Where an /uploads/ URL is stored on disk
+    if not url or not url.startswith(UPLOADS_URL_PREFIX):
+        return None
+    name = url[len(UPLOADS_URL_PREFIX):]
+    if not name or "/" in name or name.startswith("."):
+        return None
+    return os.path.join(upload_dir, name)
+
+
+def existing_variants(variants: Optional[dict], upload_dir: str) -> Optional[dict]:
+    # Only the variants written so far; a pending or failed job leaves gaps
+    found = {}
+    for fmt, by_width in (variants or {}).items():
+        written = {
+            width: url for width, url in by_width.items()
+            if os.path.exists(local_path(url, upload_dir) or "")
+        }
+        if written:
+            found[fmt] = written
+    return found or None
+
+
+def generate_derivatives(path: str, widths: list, formats: list, quality: int) -> list:
+    # Runs in a worker process
+    base = os.path.splitext(path)[0]
+    targets = [(width, fmt) for width in widths for fmt in formats]
+    targets = [(width, fmt) for width, fmt in targets if not os.path.exists(_variant_path(base, width, fmt))]
+    if not targets:
+        return []
+
+    written = []
+    with Image.open(path) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        resized = {}
+        for width, fmt in targets:
+            # Never upscale: narrow originals are re-encoded at their own size
+            target_width = min(width, image.width)
+            if target_width not in resized:
+                target_height = max(1, round(image.height * target_width / image.width))
+                resized[target_width] = image if target_width == image.width else image.resize(
+                    (target_width, target_height), Image.LANCZOS
+                )
+            output = _variant_path(base, width, fmt)
+            temp_output = f"{output}.part"
+            resized[target_width].save(temp_output, format=fmt.upper(), quality=quality)
+            os.replace(temp_output, output)
+            written.append(output)
+    return written
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _executor
+
+
+def _log_result(future):
+    _pending.discard(future)
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Error generating image derivatives: {str(error)}")
+
+
+def schedule_derivatives(path: str):
+    # Fire-and-forget: the upload response doesn't wait for resizing
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        _get_executor(), generate_derivatives, path, IMAGE_VARIANT_WIDTHS, variant_formats(), IMAGE_QUALITY
+    )
+    _pending.add(future)
+    future.add_done_callback(_log_result)
+    return future
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
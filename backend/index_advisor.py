@@ -0,0 +1,210 @@
+import argparse
+import sys
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, text
+
+from . import models, rollups
+from .database import engine
+
+# Runs EXPLAIN on the queries behind the admin dashboard, statistics, audit
+# and auth paths and flags the ones that scan a whole table.
+#
+#   python -m backend.index_advisor [--min-rows 1000]
+#
+# Exits with status 1 when a full scan is found, so it can gate CI.
+#
+# Each entry mirrors a query the app really runs (the comment or name says
+# where); an index no entry needs is only write cost on the hot tables.
+
+HOT_QUERIES = {}
+
+Finding = namedtuple("Finding", ["query", "table", "detail", "full_scan"])
+
+
+def hot_query(name: str):
+    def register(build):
+        HOT_QUERIES[name] = build
+        return build
+    return register
+
+
+def _day_start(now: datetime) -> datetime:
+    return datetime.combine(now.date(), datetime.min.time())
+
+
+@hot_query("page_view_trend")
+def _page_view_trend(now):
+    day = func.date(models.PageView.created_at)
+    return select(day, func.count()).where(
+        models.PageView.created_at >= _day_start(now) - timedelta(days=6)
+    ).group_by(day)
+
+
+@hot_query("visitor_trend")
+def _visitor_trend(now):
+    day = func.date(models.VisitorSession.first_visit)
+    return select(day, func.count(models.VisitorSession.id)).where(
+        models.VisitorSession.first_visit >= _day_start(now) - timedelta(days=6)
+    ).group_by(day)
+
+
+@hot_query("stale_visitor_sessions")
+def _stale_visitor_sessions(now):
+    return select(models.VisitorSession.id).where(
+        models.VisitorSession.last_visit < _day_start(now) - timedelta(days=30)
+    ).limit(10000)
+
+
+@hot_query("unique_visitor_sketches")
+def _unique_visitor_sketches(now):
+    return select(models.UniqueVisitorSketch.registers).where(
+        models.UniqueVisitorSketch.day >= _day_start(now).date() - timedelta(days=29),
+        models.UniqueVisitorSketch.page_path == ""
+    )
+
+
+# get_statistics: rolled-up totals plus the raw tail past each watermark
+# (rollups.page_view_stats / rollups.visitor_stats)
+@hot_query("rollup_state")
+def _rollup_state(now):
+    return select(models.RollupState.last_id).where(models.RollupState.name == rollups.PAGE_VIEWS)
+
+
+@hot_query("page_view_tail")
+def _page_view_tail(now):
+    bucket = rollups._hour_bucket(models.PageView.created_at)
+    return select(bucket, models.PageView.page_path, func.count(models.PageView.id)).where(
+        models.PageView.id > 1000
+    ).group_by(bucket, models.PageView.page_path)
+
+
+@hot_query("page_view_rollup_total")
+def _page_view_rollup_total(now):
+    return select(func.sum(models.PageViewRollup.views))
+
+
+@hot_query("page_view_rollup_by_path")
+def _page_view_rollup_by_path(now):
+    views = func.sum(models.PageViewRollup.views).label("views")
+    return select(models.PageViewRollup.page_path, views).group_by(
+        models.PageViewRollup.page_path
+    ).order_by(views.desc()).limit(10)
+
+
+@hot_query("visitor_tail")
+def _visitor_tail(now):
+    dims = (
+        func.date(models.VisitorSession.first_visit),
+        func.coalesce(models.VisitorSession.device_type, ""),
+        func.coalesce(models.VisitorSession.browser, ""),
+        func.coalesce(models.VisitorSession.os, ""),
+        func.coalesce(models.VisitorSession.country, ""),
+    )
+    return select(*dims, func.count(models.VisitorSession.id)).where(
+        models.VisitorSession.id > 1000
+    ).group_by(*dims)
+
+
+@hot_query("visitor_rollup_dimensions")
+def _visitor_rollup_dimensions(now):
+    dims = (
+        models.VisitorRollup.device_type,
+        models.VisitorRollup.browser,
+        models.VisitorRollup.os,
+        models.VisitorRollup.country,
+    )
+    return select(*dims, func.sum(models.VisitorRollup.visitors)).group_by(*dims)
+
+
+@hot_query("visitor_rollup_trend")
+def _visitor_rollup_trend(now):
+    return select(models.VisitorRollup.day, func.sum(models.VisitorRollup.visitors)).where(
+        models.VisitorRollup.day >= _day_start(now).date() - timedelta(days=6)
+    ).group_by(models.VisitorRollup.day)
+
+
+@hot_query("contact_trend")
+def _contact_trend(now):
+    day = func.date(models.Contact.created_at)
+    return select(day, func.count()).where(
+        models.Contact.created_at >= _day_start(now) - timedelta(days=6)
+    ).group_by(day)
+
+
+@hot_query("recent_admin_activity")
+def _recent_admin_activity(now):
+    return select(models.AdminLog.id).order_by(models.AdminLog.created_at.desc()).limit(10)
+
+
+# audit._summarize / audit._delete_summarized
+@hot_query("admin_log_chunk")
+def _admin_log_chunk(now):
+    return select(models.AdminLog.id).where(
+        models.AdminLog.id > 1000,
+        models.AdminLog.created_at < _day_start(now) - timedelta(days=365)
+    ).order_by(models.AdminLog.id).limit(1000)
+
+
+@hot_query("user_by_email")
+def _user_by_email(now):
+    return select(models.User.id).where(models.User.email == "admin@example.com")
+
+
+def _compile(conn, statement) -> str:
+    return str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def explain(conn, name: str, statement, min_rows: int = 1000) -> list:
+    sql = _compile(conn, statement)
+    findings = []
+    if conn.dialect.name == "mysql":
+        for row in conn.execute(text(f"EXPLAIN {sql}")).mappings():
+            if row["table"] is None:
+                continue
+            detail = f"type={row['type']} key={row['key']} rows={row['rows']} extra={row['Extra']}"
+            # MySQL happily scans tiny tables even when an index exists; only
+            # scans with no usable index, or over enough rows to matter, count
+            full_scan = row["type"] == "ALL" and (
+                row["possible_keys"] is None or (row["rows"] or 0) >= min_rows
+            )
+            findings.append(Finding(name, row["table"], detail, full_scan))
+    elif conn.dialect.name == "sqlite":
+        for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")):
+            detail = row[-1]
+            words = detail.split()
+            if words[0] not in ("SCAN", "SEARCH"):
+                continue
+            full_scan = words[0] == "SCAN" and "INDEX" not in detail
+            findings.append(Finding(name, words[1], detail, full_scan))
+    else:
+        raise ValueError(f"EXPLAIN is not supported for {conn.dialect.name}")
+    return findings
+
+
+def run(bind=None, min_rows: int = 1000, now: datetime = None) -> list:
+    now = now or datetime.utcnow()
+    findings = []
+    with (bind or engine).connect() as conn:
+        for name, build in HOT_QUERIES.items():
+            findings.extend(explain(conn, name, build(now), min_rows=min_rows))
+    return findings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN the hot queries and flag full table scans")
+    parser.add_argument("--min-rows", type=int, default=1000,
+                        help="MySQL: ignore scans of tables smaller than this when an index exists")
+    args = parser.parse_args()
+
+    findings = run(min_rows=args.min_rows)
+    for finding in findings:
+        marker = "FULL SCAN" if finding.full_scan else "ok"
+        print(f"{marker:<9} {finding.query:<26} {finding.table:<20} {finding.detail}")
+
+    full_scans = [finding for finding in findings if finding.full_scan]
+    if full_scans:
+        print(f"\n{len(full_scans)} full table scan(s) in hot queries")
+        sys.exit(1)
+    print("\nNo full table scans in hot queries")
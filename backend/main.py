@@ -1,26 +1,23 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Request, Response
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
+from sqlalchemy import func, desc, and_, or_
 from typing import List, Dict, Optional
-import shutil
 import os
+import anyio
 from datetime import timedelta, datetime
-from . import models, schemas, auth
-from .database import engine, get_db
+from . import models, schemas, auth, tracking, rollups, tasks, geoip, user_agent, pagination, uploads, images, public_cache, site_config, search, audit, retention, ratelimit, security, screening, dashboard, exports, bulk, crud, project_views, unique_visitors
+from .database import engine, get_db, get_async_db, async_engine, pool_status
 import uuid
 from dotenv import load_dotenv
 import json
 import csv
 import io
-from user_agents import parse
-import geoip2.database
-from geoip2.errors import AddressNotFoundError
 from fastapi.security import OAuth2PasswordRequestForm
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+from pydantic import TypeAdapter
 import logging
 
 load_dotenv()
@@ -38,11 +35,6 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -56,6 +48,37 @@ app.add_middleware(
 UPLOAD_DIR = "public/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+@app.on_event("startup")
+async def start_background_workers():
+    geoip.resolver.open()
+    tracking.page_view_queue.start()
+    await run_in_threadpool(search.build_index)
+    await run_in_threadpool(project_views.view_counter.reload)
+    tasks.schedule("refresh_rollups", rollups.ROLLUP_INTERVAL_SECONDS, rollups.refresh_rollups)
+    tasks.schedule("reload_geoip", geoip.GEOIP_RELOAD_INTERVAL, geoip.resolver.reload_if_changed)
+    screening.engine.reload_if_changed()
+    tasks.schedule("reload_screening_rules", screening.SCREENING_RELOAD_INTERVAL, screening.engine.reload_if_changed)
+    tasks.schedule("compact_admin_logs", audit.ADMIN_LOG_COMPACTION_INTERVAL, audit.compact_admin_logs)
+    tasks.schedule("archive_page_views", retention.PAGE_VIEW_RETENTION_INTERVAL, retention.archive_page_views)
+    tasks.schedule("flush_project_views", project_views.PROJECT_VIEW_FLUSH_INTERVAL, project_views.view_counter.flush)
+    tasks.schedule("flush_unique_visitors", unique_visitors.UNIQUE_VISITOR_FLUSH_INTERVAL, unique_visitors.counter.flush)
+    tasks.schedule("compact_visitor_sessions", retention.VISITOR_SESSION_COMPACTION_INTERVAL, retention.compact_visitor_sessions)
+    tasks.schedule("refresh_search_index", search.SEARCH_INDEX_CHECK_INTERVAL, search.refresh_index)
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await tasks.cancel_all()
+    # Write out project views counted since the last flush
+    await run_in_threadpool(project_views.view_counter.flush)
+    # Flush whatever tracking events are still buffered
+    await tracking.page_view_queue.stop()
+    # Sketches include the events drained above
+    await run_in_threadpool(unique_visitors.counter.flush)
+    geoip.resolver.close()
+    auth.password_hasher.shutdown()
+    images.shutdown()
+    await async_engine.dispose()
+
 # Middleware to track page views
 @app.middleware("http")
 async def track_page_views(request: Request, call_next):
@@ -63,75 +86,44 @@ async def track_page_views(request: Request, call_next):
     
     # Skip tracking for admin routes and static files
     if not request.url.path.startswith("/admin") and not request.url.path.startswith("/static"):
-        db = next(get_db())
+        session_id = request.cookies.get("session_id", str(uuid.uuid4()))
+        
         try:
-            # Get client IP
-            ip = request.client.host
-            
-            # Parse user agent
-            user_agent = parse(request.headers.get("user-agent", ""))
-            
-            # Create page view record
-            page_view = models.PageView(
+            # Hand the hit to the background writer; the DB work happens off the request path
+            tracking.page_view_queue.enqueue(tracking.PageViewEvent(
                 page_path=request.url.path,
-                ip_address=ip,
-                user_agent=str(user_agent),
-                referrer=request.headers.get("referer")
-            )
-            db.add(page_view)
-            
-            # Update or create visitor session
-            session_id = request.cookies.get("session_id", str(uuid.uuid4()))
-            visitor = db.query(models.VisitorSession).filter(
-                models.VisitorSession.session_id == session_id
-            ).first()
-            
-            if visitor:
-                visitor.last_visit = datetime.utcnow()
-                visitor.visit_count += 1
-            else:
-                # Try to get location data
-                try:
-                    with geoip2.database.Reader('GeoLite2-City.mmdb') as reader:
-                        location = reader.city(ip)
-                        country = location.country.name
-                        city = location.city.name
-                except (AddressNotFoundError, FileNotFoundError):
-                    country = None
-                    city = None
-                
-                visitor = models.VisitorSession(
-                    session_id=session_id,
-                    ip_address=ip,
-                    user_agent=str(user_agent),
-                    country=country,
-                    city=city,
-                    device_type=user_agent.device.family,
-                    browser=user_agent.browser.family,
-                    os=user_agent.os.family
-                )
-                db.add(visitor)
-            
-            db.commit()
-            
-            # Set session cookie if not exists
-            if "session_id" not in request.cookies:
-                response.set_cookie(
-                    key="session_id",
-                    value=session_id,
-                    max_age=30*24*60*60,  # 30 days
-                    httponly=True
-                )
-                
+                ip_address=ratelimit.client_ip(request),
+                user_agent=request.headers.get("user-agent", ""),
+                referrer=request.headers.get("referer"),
+                session_id=session_id,
+                created_at=datetime.utcnow(),
+                # The cookie the client sent back, if any; see unique_visitors.visitor_key
+                visitor_id=request.cookies.get("session_id")
+            ))
         except Exception as e:
-            db.rollback()
-            print(f"Error tracking page view: {str(e)}")
+            # Tracking must never fail the response
+            logger.error(f"Error tracking page view: {str(e)}")
+        
+        # Set session cookie if not exists
+        if "session_id" not in request.cookies:
+            response.set_cookie(
+                key="session_id",
+                value=session_id,
+                max_age=30*24*60*60,  # 30 days
+                httponly=True
+            )
     
     return response
 
 # Security middleware
 @app.middleware("http")
 async def security_middleware(request: Request, call_next):
+    # Reject requests matching a screening rule; see screening.is_public_read
+    rule = screening.engine.screen(request)
+    if rule is not None:
+        logger.warning(f"Blocked request from {ratelimit.client_ip(request)} matching screening rule {rule.name}: {request.url.path}")
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Request blocked"})
+    
     # Add security headers
     response = await call_next(request)
     response.headers["X-Content-Type-Options"] = "nosniff"
@@ -140,16 +132,26 @@ async def security_middleware(request: Request, call_next):
     response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
     return response
 
+# Upload size middleware
+# Outermost, so the limit applies to the raw body before anything reads it
+app.add_middleware(uploads.UploadSizeLimit, path="/api/admin/upload")
+
 # Authentication endpoints
-@app.post("/api/token", response_model=auth.Token)
-@limiter.limit("5/minute")
+# IPs blocked after repeated failed logins are only turned away here
+@app.post("/api/token", response_model=auth.Token, dependencies=[
+    Depends(security.require_unblocked_ip),
+    Depends(ratelimit.rate_limit("login", "5/minute"))
+])
 async def login(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     user = await auth.authenticate_user(form_data.username, form_data.password, db)
     if not user:
+        await ratelimit.rate_limiter.run(
+            security.security_middleware.track_failed_attempt, ratelimit.client_ip(request)
+        )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -157,10 +159,10 @@ async def login(
         )
     return auth.create_tokens(user)
 
-@app.post("/api/token/refresh", response_model=auth.Token)
+@app.post("/api/token/refresh", response_model=auth.Token, dependencies=[Depends(security.require_unblocked_ip)])
 async def refresh_token(
     refresh_token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     return await auth.refresh_access_token(refresh_token, db)
 
@@ -168,33 +170,181 @@ async def refresh_token(
 async def read_users_me(current_user: models.User = Depends(auth.get_current_admin_user)):
     return current_user
 
+# Public read endpoints
+# Responses are cached per entity version; admin writes bump the version on commit.
+public_cache.versions.track(
+    models.Content.__tablename__,
+    models.Event.__tablename__,
+    models.GalleryItem.__tablename__,
+    models.Notification.__tablename__,
+    models.ThemeSettings.__tablename__,
+    models.SocialMedia.__tablename__
+)
+
+NOTIFICATION_CACHE_TTL_SECONDS = 60  # expiry_date is time-based, not write-based
+
+def encode_json(schema, rows) -> bytes:
+    return TypeAdapter(List[schema]).dump_json(rows)
+
+@app.get("/api/content", response_model=List[schemas.Content])
+def get_public_content(
+    request: Request,
+    section: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    def build():
+        query = db.query(models.Content).filter(models.Content.is_published == True)
+        if section:
+            query = query.filter(models.Content.section == section)
+        return encode_json(schemas.Content, query.order_by(models.Content.id).all())
+    
+    return public_cache.cached_json_response(
+        request, ("content", section), [models.Content.__tablename__], build
+    )
+
+@app.get("/api/events", response_model=List[schemas.Event])
+def get_public_events(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    def build():
+        events = db.query(models.Event).order_by(models.Event.date.desc()).all()
+        return encode_json(schemas.Event, events)
+    
+    return public_cache.cached_json_response(
+        request, ("events",), [models.Event.__tablename__], build
+    )
+
+@app.get("/api/gallery", response_model=List[schemas.GalleryItem])
+def get_public_gallery(
+    request: Request,
+    category: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    def build():
+        query = db.query(models.GalleryItem)
+        if category:
+            query = query.filter(models.GalleryItem.category == category)
+        items = [schemas.GalleryItem.model_validate(item) for item in query.order_by(models.GalleryItem.id.desc()).all()]
+        # Variant URLs are only listed once their files exist
+        for item in items:
+            item.image_variants = images.existing_variants(item.image_variants, UPLOAD_DIR)
+        return encode_json(schemas.GalleryItem, items)
+    
+    return public_cache.cached_json_response(
+        request, ("gallery", category), [models.GalleryItem.__tablename__], build
+    )
+
+@app.get("/api/notifications", response_model=List[schemas.Notification])
+def get_public_notifications(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    def build():
+        notifications = db.query(models.Notification).filter(or_(
+            models.Notification.expiry_date == None,
+            models.Notification.expiry_date > datetime.utcnow()
+        )).order_by(models.Notification.id.desc()).all()
+        return encode_json(schemas.Notification, notifications)
+    
+    return public_cache.cached_json_response(
+        request, ("notifications",), [models.Notification.__tablename__], build,
+        ttl=NOTIFICATION_CACHE_TTL_SECONDS
+    )
+
+@app.get("/api/theme", response_model=schemas.ThemeSettings)
+def get_public_theme_settings(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    def build():
+        settings = db.query(models.ThemeSettings).first()
+        if not settings:
+            raise HTTPException(status_code=404, detail="Theme settings not found")
+        return TypeAdapter(schemas.ThemeSettings).dump_json(settings)
+    
+    return public_cache.cached_json_response(
+        request, ("theme",), [models.ThemeSettings.__tablename__], build
+    )
+
+@app.get("/api/social-media", response_model=List[schemas.SocialMedia])
+def get_public_social_media(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    def build():
+        social_media = db.query(models.SocialMedia).filter(
+            models.SocialMedia.is_active == True
+        ).order_by(models.SocialMedia.id).all()
+        return encode_json(schemas.SocialMedia, social_media)
+    
+    return public_cache.cached_json_response(
+        request, ("social_media",), [models.SocialMedia.__tablename__], build
+    )
+
+@app.get("/api/site-config", response_model=schemas.SiteConfig)
+def get_site_config(request: Request):
+    # Prebuilt document; only rebuilt after theme, social media or notification writes
+    return site_config.site_config_response(request)
+
+# Search endpoint
+@app.get("/api/search", response_model=List[schemas.SearchResult])
+def search_site(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[List[str]] = Query(None, alias="type"),
+    section: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50)
+):
+    unknown = set(types or []) - set(search.SEARCH_TYPES)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown search type(s): {', '.join(sorted(unknown))}"
+        )
+    
+    return search.search_index.search(q, types=set(types or []), section=section, limit=limit)
+
+# Project view endpoints
+@app.post("/api/projects/{project_id}/view", dependencies=[Depends(ratelimit.rate_limit("project_view", "30/minute"))])
+def record_project_view(project_id: int, db: Session = Depends(get_db)):
+    if not project_views.view_counter.knows(project_id):
+        # Created since the last reload, or not a project at all
+        project = db.get(models.Project, project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        project_views.view_counter.add_project(project.id, project.title, project.views)
+    
+    # Counted in memory and written in batches by the flush task
+    project_views.view_counter.record(project_id)
+    return {"views": project_views.view_counter.views(project_id)}
+
+@app.get("/api/projects/most-viewed", response_model=List[schemas.ProjectViews])
+def get_most_viewed_projects(limit: int = Query(5, ge=1, le=50)):
+    return project_views.view_counter.top(limit)
+
 # Content management endpoints
-@app.get("/api/admin/content", response_model=List[schemas.Content])
+@app.get("/api/admin/content", response_model=pagination.page_model(schemas.Content), response_model_exclude_unset=True)
 def get_all_content(
+    page: pagination.PageParams = Depends(pagination.page_params),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_admin_user)
 ):
-    return db.query(models.Content).all()
+    return pagination.paginate(db, models.Content, schemas.Content, page)
 
 @app.post("/api/admin/content", response_model=schemas.Content)
 def create_content(
     content: schemas.ContentCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
 ):
     db_content = models.Content(**content.dict())
     db.add(db_content)
-    db.commit()
-    db.refresh(db_content)
+    db.flush()
     
-    # Log admin action
-    admin_log = models.AdminLog(
-        user_id=current_user.id,
-        action="create_content",
-        details={"content_id": db_content.id, "title": db_content.title}
-    )
-    db.add(admin_log)
+    # Log admin action in the same transaction
+    audit_log.record("create_content", {"content_id": db_content.id, "title": db_content.title})
     db.commit()
+    db.refresh(db_content)
     
     return db_content
 
@@ -203,7 +353,7 @@ def update_content(
     content_id: int,
     content: schemas.ContentCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
 ):
     db_content = db.query(models.Content).filter(models.Content.id == content_id).first()
     if not db_content:
@@ -212,17 +362,12 @@ def update_content(
     for key, value in content.dict().items():
         setattr(db_content, key, value)
     
-    db.commit()
-    db.refresh(db_content)
+    db.flush()
     
-    # Log admin action
-    admin_log = models.AdminLog(
-        user_id=current_user.id,
-        action="update_content",
-        details={"content_id": content_id, "title": db_content.title}
-    )
-    db.add(admin_log)
+    # Log admin action in the same transaction
+    audit_log.record("update_content", {"content_id": content_id, "title": db_content.title})
     db.commit()
+    db.refresh(db_content)
     
     return db_content
 
@@ -230,7 +375,7 @@ def update_content(
 def delete_content(
     content_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
 ):
     db_content = db.query(models.Content).filter(models.Content.id == content_id).first()
     if not db_content:
@@ -238,104 +383,96 @@ def delete_content(
     
     db.delete(db_content)
     
-    # Log admin action
-    admin_log = models.AdminLog(
-        user_id=current_user.id,
-        action="delete_content",
-        details={"content_id": content_id, "title": db_content.title}
-    )
-    db.add(admin_log)
+    # Log admin action in the same transaction
+    audit_log.record("delete_content", {"content_id": content_id, "title": db_content.title})
     db.commit()
     
     return {"message": "Content deleted successfully"}
 
 # Gallery management endpoints
-@app.get("/api/admin/gallery", response_model=List[schemas.GalleryItem])
+@app.get("/api/admin/gallery", response_model=pagination.page_model(schemas.GalleryItem), response_model_exclude_unset=True)
 def get_all_gallery_items(
+    page: pagination.PageParams = Depends(pagination.page_params),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_admin_user)
 ):
-    return db.query(models.GalleryItem).all()
+    return pagination.paginate(db, models.GalleryItem, schemas.GalleryItem, page)
 
 @app.post("/api/admin/gallery", response_model=schemas.GalleryItem)
 def create_gallery_item(
     gallery_item: schemas.GalleryItemCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
 ):
-    db_gallery_item = models.GalleryItem(**gallery_item.dict())
+    db_gallery_item = models.GalleryItem(
+        **gallery_item.dict(),
+        image_variants=images.variant_map(gallery_item.image_url)
+    )
     db.add(db_gallery_item)
+    db.flush()
+    
+    # Log admin action in the same transaction
+    audit_log.record("create_gallery_item", {"gallery_item_id": db_gallery_item.id, "title": db_gallery_item.title})
     db.commit()
     db.refresh(db_gallery_item)
     
-    # Log admin action
-    admin_log = models.AdminLog(
-        user_id=current_user.id,
-        action="create_gallery_item",
-        details={"gallery_item_id": db_gallery_item.id, "title": db_gallery_item.title}
-    )
-    db.add(admin_log)
-    db.commit()
+    # Covers images uploaded before variants existed and failed derivative
+    # jobs; files already written are skipped
+    path = images.local_path(db_gallery_item.image_url, UPLOAD_DIR)
+    if db_gallery_item.image_variants and path and os.path.exists(path):
+        anyio.from_thread.run_sync(images.schedule_derivatives, path)
     
     return db_gallery_item
 
 # Event management endpoints
-@app.get("/api/admin/events", response_model=List[schemas.Event])
+@app.get("/api/admin/events", response_model=pagination.page_model(schemas.Event), response_model_exclude_unset=True)
 def get_all_events(
+    page: pagination.PageParams = Depends(pagination.page_params),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_admin_user)
 ):
-    return db.query(models.Event).all()
+    return pagination.paginate(db, models.Event, schemas.Event, page)
 
 @app.post("/api/admin/events", response_model=schemas.Event)
 def create_event(
     event: schemas.EventCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
 ):
     db_event = models.Event(**event.dict())
     db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+    db.flush()
     
-    # Log admin action
-    admin_log = models.AdminLog(
-        user_id=current_user.id,
-        action="create_event",
-        details={"event_id": db_event.id, "title": db_event.title}
-    )
-    db.add(admin_log)
+    # Log admin action in the same transaction
+    audit_log.record("create_event", {"event_id": db_event.id, "title": db_event.title})
     db.commit()
+    db.refresh(db_event)
     
     return db_event
 
 # Notification management endpoints
-@app.get("/api/admin/notifications", response_model=List[schemas.Notification])
+@app.get("/api/admin/notifications", response_model=pagination.page_model(schemas.Notification), response_model_exclude_unset=True)
 def get_all_notifications(
+    page: pagination.PageParams = Depends(pagination.page_params),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_admin_user)
 ):
-    return db.query(models.Notification).all()
+    return pagination.paginate(db, models.Notification, schemas.Notification, page)
 
 @app.post("/api/admin/notifications", response_model=schemas.Notification)
 def create_notification(
     notification: schemas.NotificationCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
 ):
     db_notification = models.Notification(**notification.dict())
     db.add(db_notification)
-    db.commit()
-    db.refresh(db_notification)
+    db.flush()
     
-    # Log admin action
-    admin_log = models.AdminLog(
-        user_id=current_user.id,
-        action="create_notification",
-        details={"notification_id": db_notification.id, "title": db_notification.title}
-    )
-    db.add(admin_log)
+    # Log admin action in the same transaction
+    audit_log.record("create_notification", {"notification_id": db_notification.id, "title": db_notification.title})
     db.commit()
+    db.refresh(db_notification)
     
     return db_notification
 
@@ -354,7 +491,7 @@ def get_theme_settings(
 def update_theme_settings(
     settings: schemas.ThemeSettingsCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
 ):
     db_settings = db.query(models.ThemeSettings).first()
     if not db_settings:
@@ -364,47 +501,40 @@ def update_theme_settings(
         for key, value in settings.dict().items():
             setattr(db_settings, key, value)
     
-    db.commit()
-    db.refresh(db_settings)
+    db.flush()
     
-    # Log admin action
-    admin_log = models.AdminLog(
-        user_id=current_user.id,
-        action="update_theme_settings",
-        details={"settings_id": db_settings.id}
-    )
-    db.add(admin_log)
+    # Log admin action in the same transaction
+    audit_log.record("update_theme_settings", {"settings_id": db_settings.id})
     db.commit()
+    db.refresh(db_settings)
     
     return db_settings
 
 # Social media endpoints
-@app.get("/api/admin/social-media", response_model=List[schemas.SocialMedia])
+@app.get("/api/admin/social-media", response_model=pagination.page_model(schemas.SocialMedia), response_model_exclude_unset=True)
 def get_all_social_media(
+    page: pagination.PageParams = Depends(pagination.page_params),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_admin_user)
 ):
-    return db.query(models.SocialMedia).all()
+    return pagination.paginate(db, models.SocialMedia, schemas.SocialMedia, page)
 
 @app.post("/api/admin/social-media", response_model=schemas.SocialMedia)
 def create_social_media(
     social_media: schemas.SocialMediaCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_admin_user)
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
 ):
-    db_social_media = models.SocialMedia(**social_media.dict())
+    social_media_data = social_media.dict()
+    social_media_data["url"] = str(social_media.url)
+    db_social_media = models.SocialMedia(**social_media_data)
     db.add(db_social_media)
-    db.commit()
-    db.refresh(db_social_media)
+    db.flush()
     
-    # Log admin action
-    admin_log = models.AdminLog(
-        user_id=current_user.id,
-        action="create_social_media",
-        details={"social_media_id": db_social_media.id, "platform": db_social_media.platform}
-    )
-    db.add(admin_log)
+    # Log admin action in the same transaction
+    audit_log.record("create_social_media", {"social_media_id": db_social_media.id, "platform": db_social_media.platform})
     db.commit()
+    db.refresh(db_social_media)
     
     return db_social_media
 
@@ -414,17 +544,118 @@ async def upload_file(
     file: UploadFile = File(...),
     current_user: models.User = Depends(auth.get_current_admin_user)
 ):
-    # Generate unique filename
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    # Save file under its content hash; re-uploads reuse the existing copy
+    stored = await uploads.store_upload(file, UPLOAD_DIR)
     
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Resized/WebP variants are generated in the background
+    variants = images.variant_map(stored["url"])
+    if variants:
+        images.schedule_derivatives(stored["path"])
     
     # Return file URL
-    return {"url": f"/uploads/{unique_filename}"}
+    return {
+        "url": stored["url"],
+        "sha256": stored["sha256"],
+        "size": stored["size"],
+        "deduplicated": stored["deduplicated"],
+        "variants": variants
+    }
+
+# Generated admin CRUD endpoints
+app.include_router(crud.crud_router(models.Course, schemas.Course, schemas.CourseCreate, "courses", "course"))
+app.include_router(crud.crud_router(models.Department, schemas.Department, schemas.DepartmentCreate, "departments", "department"))
+app.include_router(crud.crud_router(models.FAQ, schemas.FAQ, schemas.FAQCreate, "faqs", "faq"))
+app.include_router(crud.crud_router(models.Project, schemas.Project, schemas.ProjectCreate, "projects", "project"))
+app.include_router(crud.crud_router(models.Skill, schemas.Skill, schemas.SkillCreate, "skills", "skill"))
+app.include_router(crud.crud_router(models.Contact, schemas.Contact, schemas.ContactCreate, "contacts", "contact"))
+app.include_router(crud.crud_router(models.Subscriber, schemas.Subscriber, schemas.SubscriberCreate, "subscribers", "subscriber"))
+
+# Bulk endpoints
+# Body is a JSON array, a text/csv body, or a CSV upload in a "file" form field
+@app.post("/api/admin/bulk/{entity}")
+def bulk_create(
+    entity: str,
+    # Declared first so the admin check runs before the body is parsed
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log),
+    db: Session = Depends(get_db),
+    rows: list = Depends(bulk.bulk_rows)
+):
+    return bulk.bulk_create(db, audit_log, entity, rows)
+
+@app.put("/api/admin/bulk/{entity}")
+def bulk_update(
+    entity: str,
+    # Declared first so the admin check runs before the body is parsed
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log),
+    db: Session = Depends(get_db),
+    rows: list = Depends(bulk.bulk_rows)
+):
+    return bulk.bulk_update(db, audit_log, entity, rows)
+
+@app.post("/api/admin/bulk/{entity}/delete")
+def bulk_delete(
+    entity: str,
+    # Declared first so the admin check runs before the body is parsed
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log),
+    db: Session = Depends(get_db),
+    rows: list = Depends(bulk.bulk_rows)
+):
+    return bulk.bulk_delete(db, audit_log, entity, rows)
+
+# Export endpoints
+@app.get("/api/admin/export/{dataset}")
+def export_dataset(
+    dataset: str,
+    export_format: str = Query("csv", alias="format"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    audit_log: audit.AuditLog = Depends(audit.admin_audit_log)
+):
+    if dataset not in exports.DATASETS:
+        raise HTTPException(status_code=404, detail="Unknown export dataset")
+    if export_format not in exports.FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown export format, expected one of: {', '.join(exports.FORMATS)}"
+        )
+    
+    audit_log.record("export_data", {
+        "dataset": dataset,
+        "format": export_format,
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None
+    })
+    db.commit()
+    
+    # Streamed chunk by chunk; nothing is buffered beyond one cursor batch
+    return StreamingResponse(
+        exports.stream_export(dataset, export_format, start, end),
+        media_type=exports.FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{exports.filename(dataset, export_format, start, end)}"'}
+    )
+
+# Internal metrics endpoint
+@app.get("/api/admin/metrics")
+def get_metrics(
+    current_user: models.User = Depends(auth.get_current_admin_user)
+):
+    return {
+        "tracking": tracking.page_view_queue.stats(),
+        "geoip": geoip.resolver.stats(),
+        "user_agents": user_agent.cache_stats(),
+        "principals": auth.principal_cache_stats(),
+        "password_hasher": auth.password_hasher.stats(),
+        "db_pool": pool_status(),
+        "public_cache": public_cache.response_cache.stats(),
+        "site_config": site_config.site_config.stats(),
+        "search": search.search_index.stats(),
+        "rate_limiter": ratelimit.rate_limiter.stats(),
+        "screening": screening.engine.stats(),
+        "dashboard": dashboard.cache_stats(),
+        "project_views": project_views.view_counter.stats(),
+        "unique_visitors": unique_visitors.counter.stats()
+    }
 
 # Statistics endpoint
 @app.get("/api/admin/statistics", response_model=schemas.Statistics)
@@ -432,14 +663,9 @@ def get_statistics(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_admin_user)
 ):
-    # Get total visitors
-    total_visitors = db.query(func.count(models.VisitorSession.id)).scalar()
-    
-    # Get unique visitors
-    unique_visitors = db.query(func.count(models.VisitorSession.session_id.distinct())).scalar()
-    
-    # Get total page views
-    total_page_views = db.query(func.count(models.PageView.id)).scalar()
+    # Analytics come from the rollup tables plus the not-yet-rolled-up tail
+    page_stats = rollups.page_view_stats(db)
+    visitor_stats = rollups.visitor_stats(db)
     
     # Get total contacts
     total_contacts = db.query(func.count(models.ContactMessage.id)).scalar()
@@ -447,145 +673,43 @@ def get_statistics(
     # Get total subscribers
     total_subscribers = db.query(func.count(models.Subscriber.id)).scalar()
     
-    # Get visitor trends (last 7 days)
-    visitor_trends = []
-    for i in range(7):
-        date = datetime.utcnow() - timedelta(days=i)
-        count = db.query(func.count(models.VisitorSession.id)).filter(
-            func.date(models.VisitorSession.first_visit) == date.date()
-        ).scalar()
-        visitor_trends.append({"date": date.date().isoformat(), "count": count})
-    
-    # Get top pages
-    top_pages = db.query(
-        models.PageView.page_path,
-        func.count(models.PageView.id).label("views")
-    ).group_by(models.PageView.page_path).order_by(desc("views")).limit(10).all()
-    top_pages = [{"path": page[0], "views": page[1]} for page in top_pages]
-    
-    # Get device stats
-    device_stats = db.query(
-        models.VisitorSession.device_type,
-        func.count(models.VisitorSession.id).label("count")
-    ).group_by(models.VisitorSession.device_type).all()
-    device_stats = {stat[0]: stat[1] for stat in device_stats}
-    
-    # Get browser stats
-    browser_stats = db.query(
-        models.VisitorSession.browser,
-        func.count(models.VisitorSession.id).label("count")
-    ).group_by(models.VisitorSession.browser).all()
-    browser_stats = {stat[0]: stat[1] for stat in browser_stats}
-    
-    # Get OS stats
-    os_stats = db.query(
-        models.VisitorSession.os,
-        func.count(models.VisitorSession.id).label("count")
-    ).group_by(models.VisitorSession.os).all()
-    os_stats = {stat[0]: stat[1] for stat in os_stats}
-    
-    # Get country stats
-    country_stats = db.query(
-        models.VisitorSession.country,
-        func.count(models.VisitorSession.id).label("count")
-    ).group_by(models.VisitorSession.country).all()
-    country_stats = {stat[0]: stat[1] for stat in country_stats if stat[0]}
+    # HyperLogLog estimates keyed by session id; see unique_visitors.visitor_key
+    unique_visitor_stats = unique_visitors.counter.summary(db)
     
     return {
-        "total_visitors": total_visitors,
-        "unique_visitors": unique_visitors,
-        "total_page_views": total_page_views,
+        "total_visitors": visitor_stats["total_visitors"],
+        "unique_visitors": unique_visitors.counter.lifetime(db),
+        "unique_visitors_daily": unique_visitor_stats["daily"],
+        "unique_visitors_weekly": unique_visitor_stats["weekly"],
+        "unique_visitors_monthly": unique_visitor_stats["monthly"],
+        "total_page_views": page_stats["total_page_views"],
         "total_contacts": total_contacts,
         "total_subscribers": total_subscribers,
-        "visitor_trends": visitor_trends,
-        "top_pages": top_pages,
-        "device_stats": device_stats,
-        "browser_stats": browser_stats,
-        "os_stats": os_stats,
-        "country_stats": country_stats
+        "visitor_trends": visitor_stats["visitor_trends"],
+        "top_pages": page_stats["top_pages"],
+        "device_stats": visitor_stats["device_stats"],
+        "browser_stats": visitor_stats["browser_stats"],
+        "os_stats": visitor_stats["os_stats"],
+        "country_stats": visitor_stats["country_stats"]
     }
 
+@app.get("/api/admin/statistics/unique-visitors", response_model=schemas.UniqueVisitors)
+def get_unique_visitors(
+    page: Optional[str] = Query(None, description="Page path; the whole site when omitted"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_admin_user)
+):
+    return unique_visitors.counter.summary(db, page_path=page or unique_visitors.SITE)
+
 # Admin endpoints
 @app.get("/api/admin/dashboard/widgets")
-async def get_dashboard_widgets(
+def get_dashboard_widgets(
     current_user: models.User = Depends(auth.get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     try:
-        # Get today's date
-        today = datetime.utcnow().date()
-        
-        # Get today's visitors
-        today_visitors = db.query(models.Visitor).filter(
-            models.Visitor.created_at >= today
-        ).count()
-        
-        # Get today's page views
-        today_page_views = db.query(models.PageView).filter(
-            models.PageView.created_at >= today
-        ).count()
-        
-        # Get today's new contacts
-        today_contacts = db.query(models.Contact).filter(
-            models.Contact.created_at >= today
-        ).count()
-        
-        # Get visitor trends for last 7 days
-        visitor_trends = []
-        for i in range(7):
-            date = today - timedelta(days=i)
-            count = db.query(models.Visitor).filter(
-                models.Visitor.created_at >= date,
-                models.Visitor.created_at < date + timedelta(days=1)
-            ).count()
-            visitor_trends.append({
-                "date": date.isoformat(),
-                "count": count
-            })
-        visitor_trends.reverse()
-        
-        # Get top viewed projects
-        top_projects = db.query(
-            models.Project,
-            models.ProjectView
-        ).join(
-            models.ProjectView
-        ).group_by(
-            models.Project.id
-        ).order_by(
-            models.ProjectView.count().desc()
-        ).limit(5).all()
-        
-        # Get recent admin activities
-        recent_activities = db.query(models.AdminLog).order_by(
-            models.AdminLog.created_at.desc()
-        ).limit(10).all()
-        
-        return {
-            "today_stats": {
-                "visitors": today_visitors,
-                "page_views": today_page_views,
-                "contacts": today_contacts
-            },
-            "visitor_trends": visitor_trends,
-            "top_projects": [
-                {
-                    "id": project.id,
-                    "title": project.title,
-                    "views": views
-                }
-                for project, views in top_projects
-            ],
-            "recent_activities": [
-                {
-                    "id": activity.id,
-                    "action": activity.action,
-                    "details": activity.details,
-                    "created_at": activity.created_at.isoformat()
-                }
-                for activity in recent_activities
-            ]
-        }
+        # Cached for a few seconds so polling dashboards share one set of queries
+        return dashboard.dashboard_widgets(db)
     except Exception as e:
         logger.error(f"Error getting dashboard widgets: {str(e)}")
         raise HTTPException(
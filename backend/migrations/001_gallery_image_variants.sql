@@ -0,0 +1,2 @@
+-- Derivative image URLs for gallery items (see backend/images.py)
+ALTER TABLE gallery_items ADD COLUMN image_variants JSON NULL AFTER image_url;
@@ -0,0 +1,18 @@
+-- Monthly RANGE partitions for admin_logs (see backend/audit.py and backend/partitions.py).
+-- MySQL partitioned tables cannot carry foreign keys, and the partitioning
+-- column must be part of every unique key, so the primary key becomes
+-- (id, created_at). The constraint name below is MySQL's default for the
+-- key created by create_all(); check SHOW CREATE TABLE admin_logs if it differs.
+ALTER TABLE admin_logs DROP FOREIGN KEY admin_logs_ibfk_1;
+
+ALTER TABLE admin_logs
+    MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, created_at);
+
+-- Older rows stay in p_history until they expire; the compaction job splits
+-- p_future into monthly partitions ahead of time.
+ALTER TABLE admin_logs PARTITION BY RANGE (TO_DAYS(created_at)) (
+    PARTITION p_history VALUES LESS THAN (TO_DAYS('2026-11-01')),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
@@ -0,0 +1,14 @@
+-- Monthly RANGE partitions for page_views (see backend/retention.py and backend/partitions.py).
+-- The partitioning column must be part of every unique key, so the primary
+-- key becomes (id, created_at).
+ALTER TABLE page_views
+    MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, created_at);
+
+-- Existing rows stay in p_history until they age out of the retention window;
+-- the retention job splits p_future into monthly partitions ahead of time.
+ALTER TABLE page_views PARTITION BY RANGE (TO_DAYS(created_at)) (
+    PARTITION p_history VALUES LESS THAN (TO_DAYS('2026-11-01')),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
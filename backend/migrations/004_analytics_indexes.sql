@@ -0,0 +1,13 @@
+-- Secondary indexes for the analytics, dashboard and audit queries
+-- (see backend/models.py and python -m backend.index_advisor).
+CREATE INDEX ix_page_views_created_at_page_path ON page_views (created_at, page_path);
+CREATE INDEX ix_page_views_page_path_created_at ON page_views (page_path, created_at);
+
+CREATE INDEX ix_visitor_sessions_first_visit_dims ON visitor_sessions (first_visit, device_type, browser, os, country);
+CREATE INDEX ix_visitor_sessions_country ON visitor_sessions (country);
+
+CREATE INDEX ix_admin_logs_created_at ON admin_logs (created_at);
+
+CREATE INDEX ix_contacts_created_at ON contacts (created_at);
+
+CREATE INDEX ix_contact_messages_is_read_created_at ON contact_messages (is_read, created_at);
@@ -0,0 +1,14 @@
+-- HyperLogLog unique-visitor sketches (see backend/unique_visitors.py) and the
+-- index used to compact stale visitor sessions (retention.compact_visitor_sessions).
+CREATE TABLE IF NOT EXISTS unique_visitor_sketches (
+    id INT NOT NULL AUTO_INCREMENT,
+    day DATE NOT NULL,
+    page_path VARCHAR(255) NOT NULL DEFAULT '',
+    registers BLOB NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_unique_visitor_sketches_day_path (day, page_path),
+    KEY ix_unique_visitor_sketches_id (id)
+);
+
+CREATE INDEX ix_visitor_sessions_last_visit ON visitor_sessions (last_visit);
@@ -0,0 +1,6 @@
+-- Covering indexes for the rollup sums behind /api/admin/statistics
+-- (rollups.page_view_stats / rollups.visitor_stats, see python -m backend.index_advisor).
+CREATE INDEX ix_page_view_rollups_views ON page_view_rollups (views);
+CREATE INDEX ix_page_view_rollups_page_path_views ON page_view_rollups (page_path, views);
+
+CREATE INDEX ix_visitor_rollups_dims_visitors ON visitor_rollups (device_type, browser, os, country, visitors);
@@ -0,0 +1,7 @@
+-- Indexes from 004 that no query in the app uses; each one was only extra
+-- write cost (see python -m backend.index_advisor for the queries that run).
+DROP INDEX ix_page_views_page_path_created_at ON page_views;
+
+DROP INDEX ix_visitor_sessions_country ON visitor_sessions;
+
+DROP INDEX ix_contact_messages_is_read_created_at ON contact_messages;
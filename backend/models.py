@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Boolean, ForeignKey, JSON, Float, UniqueConstraint, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -56,6 +56,7 @@ class GalleryItem(Base):
     description = Column(Text)
     category = Column(String(100))
     image_url = Column(String(255))
+    image_variants = Column(JSON)  # {format: {width: url}} for derivatives of image_url
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -135,7 +136,7 @@ class Contact(Base):
     name = Column(String(255))
     email = Column(String(255))
     message = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     is_read = Column(Boolean, default=False)
     response = Column(Text, nullable=True)
     responded_at = Column(DateTime, nullable=True)
@@ -150,6 +151,11 @@ class PageView(Base):
     referrer = Column(String(255))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Time-window counts, e.g. the dashboard trend
+        Index("ix_page_views_created_at_page_path", "created_at", "page_path"),
+    )
+
 class VisitorSession(Base):
     __tablename__ = "visitor_sessions"
 
@@ -166,6 +172,65 @@ class VisitorSession(Base):
     first_visit = Column(DateTime(timezone=True), server_default=func.now())
     last_visit = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Covers visitor counts over a date range broken down by any dimension
+        Index("ix_visitor_sessions_first_visit_dims", "first_visit", "device_type", "browser", "os", "country"),
+        # Finds stale sessions for compaction
+        Index("ix_visitor_sessions_last_visit", "last_visit"),
+    )
+
+class PageViewRollup(Base):
+    __tablename__ = "page_view_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(DateTime, nullable=False)  # start of the hour
+    page_path = Column(String(255), nullable=False, default="")
+    views = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("bucket", "page_path", name="uq_page_view_rollups_bucket_path"),
+        # Cover the total and per-path sums in rollups.page_view_stats
+        Index("ix_page_view_rollups_views", "views"),
+        Index("ix_page_view_rollups_page_path_views", "page_path", "views"),
+    )
+
+class VisitorRollup(Base):
+    __tablename__ = "visitor_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    device_type = Column(String(50), nullable=False, default="")
+    browser = Column(String(50), nullable=False, default="")
+    os = Column(String(50), nullable=False, default="")
+    country = Column(String(100), nullable=False, default="")
+    visitors = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("day", "device_type", "browser", "os", "country", name="uq_visitor_rollups_dims"),
+        # Covers the per-dimension sums in rollups.visitor_stats
+        Index("ix_visitor_rollups_dims_visitors", "device_type", "browser", "os", "country", "visitors"),
+    )
+
+class UniqueVisitorSketch(Base):
+    __tablename__ = "unique_visitor_sketches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    page_path = Column(String(255), nullable=False, default="")  # "" is the whole site
+    registers = Column(LargeBinary, nullable=False)  # compressed HyperLogLog, see hll.py
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("day", "page_path", name="uq_unique_visitor_sketches_day_path"),
+    )
+
+class RollupState(Base):
+    __tablename__ = "rollup_state"
+
+    name = Column(String(50), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class AdminLog(Base):
     __tablename__ = "admin_logs"
 
@@ -173,13 +238,27 @@ class AdminLog(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     action = Column(String(255))
     details = Column(JSON)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     user = relationship("User", back_populates="admin_logs")
 
 # Add relationship to User model
 User.admin_logs = relationship("AdminLog", back_populates="user")
 
+class AdminLogSummary(Base):
+    # Daily per-user, per-action counts kept after raw admin logs expire
+    __tablename__ = "admin_log_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    user_id = Column(Integer, nullable=False, default=0)
+    action = Column(String(255), nullable=False, default="")
+    actions = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("day", "user_id", "action", name="uq_admin_log_summaries_dims"),
+    )
+
 class Notification(Base):
     __tablename__ = "notifications"
 
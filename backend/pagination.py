@@ -0,0 +1,76 @@
+from functools import lru_cache
+from typing import NamedTuple, Optional, Type
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, create_model
+from sqlalchemy.orm import Session
+
+from . import schemas
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PageParams(NamedTuple):
+    limit: int
+    after: Optional[int]
+    fields: Optional[str]
+
+
+def page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+) -> PageParams:
+    return PageParams(limit=limit, after=after, fields=fields)
+
+
+@lru_cache(maxsize=None)
+def partial(schema: Type[BaseModel]) -> Type[BaseModel]:
+    # The schema with every field optional, for items projected with fields=.
+    # Routes set response_model_exclude_unset so only the projected fields
+    # are sent, while full pages still validate every field.
+    return create_model(
+        f"{schema.__name__}Fields",
+        **{name: (Optional[field.annotation], None) for name, field in schema.model_fields.items()}
+    )
+
+
+def page_model(schema: Type[BaseModel]) -> Type[BaseModel]:
+    return schemas.Page[partial(schema)]
+
+
+def select_columns(model, schema: Type[BaseModel], fields: Optional[str]):
+    # Only fields the response schema exposes can be projected; id is always
+    # included because it is the cursor.
+    allowed = [name for name in schema.model_fields if hasattr(model, name)]
+    if not fields:
+        names = allowed
+    else:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if "id" not in names:
+        names = ["id"] + names
+    return [getattr(model, name) for name in names]
+
+
+def paginate(db: Session, model, schema: Type[BaseModel], page: PageParams, query=None) -> schemas.Page:
+    # Keyset pagination on the primary key: each page is an index range scan
+    # that reads at most limit + 1 rows, however deep the cursor is.
+    columns = select_columns(model, schema, page.fields)
+    query = query if query is not None else db.query(model)
+    query = query.with_entities(*columns)
+    if page.after is not None:
+        query = query.filter(model.id > page.after)
+    rows = query.order_by(model.id).limit(page.limit + 1).all()
+
+    has_more = len(rows) > page.limit
+    rows = rows[:page.limit]
+    item = partial(schema)
+    # next_cursor is always passed, so exclude_unset keeps it on the last page
+    return page_model(schema)(
+        items=[item(**row._mapping) for row in rows],
+        next_cursor=rows[-1].id if has_more else None,
+    )
@@ -0,0 +1,101 @@
+from collections import namedtuple
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+
+# Helpers for MySQL tables RANGE-partitioned on TO_DAYS(<column>) into monthly
+# partitions named pYYYYMM, followed by a catch-all p_future partition:
+#
+#   PARTITION BY RANGE (TO_DAYS(created_at)) (
+#       PARTITION p202401 VALUES LESS THAN (TO_DAYS('2024-02-01')),
+#       ...
+#       PARTITION p_future VALUES LESS THAN MAXVALUE
+#   )
+#
+# Every function takes a Connection; on other databases is_partitioned() is
+# False and callers fall back to plain DELETEs.
+FUTURE_PARTITION = "p_future"
+_TO_DAYS_OFFSET = 365  # MySQL TO_DAYS() - date.toordinal()
+
+Partition = namedtuple("Partition", ["name", "upper_bound", "rows"])
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def is_partitioned(conn, table: str) -> bool:
+    if conn.dialect.name != "mysql":
+        return False
+    return bool(list_partitions(conn, table))
+
+
+def list_partitions(conn, table: str) -> list:
+    # upper_bound is the first day NOT in the partition (None for MAXVALUE);
+    # rows is the optimizer's estimate from information_schema
+    rows = conn.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS "
+        "FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {"table": table}).all()
+    return [
+        Partition(
+            name=name,
+            upper_bound=None if description == "MAXVALUE" else date.fromordinal(int(description) - _TO_DAYS_OFFSET),
+            rows=table_rows,
+        )
+        for name, description, table_rows in rows
+    ]
+
+
+def ensure_future_partitions(conn, table: str, until: date) -> list:
+    # Split p_future so every month up to and including `until` has its own
+    # partition. p_future should be empty (or nearly) so this is cheap.
+    partitions = list_partitions(conn, table)
+    bounded = [p.upper_bound for p in partitions if p.upper_bound is not None]
+    if not bounded or FUTURE_PARTITION not in {p.name for p in partitions}:
+        return []
+
+    start = max(bounded)
+    created = []
+    definitions = []
+    month = month_start(start)
+    while month <= until:
+        upper = next_month(month)
+        name = f"p{month:%Y%m}"
+        definitions.append(f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{upper.isoformat()}'))")
+        created.append(name)
+        month = upper
+    if not definitions:
+        return []
+
+    definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+    conn.execute(text(
+        f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(definitions)})"
+    ))
+    return created
+
+
+def partitions_before(conn, table: str, cutoff: date) -> list:
+    # Partitions that hold only rows older than `cutoff`, oldest first
+    return [
+        p for p in list_partitions(conn, table)
+        if p.upper_bound is not None and p.upper_bound <= cutoff
+    ]
+
+
+def drop_partitions(conn, table: str, names: list):
+    if names:
+        conn.execute(text(f"ALTER TABLE {table} DROP PARTITION {', '.join(names)}"))
+
+
+def droppable_cutoff(partitions: list) -> Optional[date]:
+    # Everything strictly before this date lives in the given partitions
+    bounds = [p.upper_bound for p in partitions if p.upper_bound is not None]
+    return max(bounds) if bounds else None
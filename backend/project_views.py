@@ -0,0 +1,153 @@
+import heapq
+import logging
+import os
+import threading
+from collections import Counter
+
+from sqlalchemy import bindparam, func, select, update
+
+from . import models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PROJECT_VIEW_FLUSH_INTERVAL = float(os.getenv("PROJECT_VIEW_FLUSH_INTERVAL", "10"))
+
+_projects = models.Project.__table__
+
+# One executemany for the whole batch. Increments are applied relative to the
+# stored value, so concurrent flushes from several workers never lose counts
+# and no row is locked for longer than its own UPDATE. updated_at is set to
+# itself so a view doesn't count as an edit.
+_INCREMENT = update(_projects).where(_projects.c.id == bindparam("project_id")).values(
+    views=func.coalesce(_projects.c.views, 0) + bindparam("increment"),
+    updated_at=_projects.c.updated_at,
+)
+
+
+class ProjectViewCounter:
+    # Views are counted in memory and written periodically. Totals shown to
+    # readers are the stored count plus whatever this process hasn't written
+    # yet, so top-N queries never touch the database.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()
+        self._in_flight = Counter()
+        self._stored = {}  # project id -> (title, views) as of the last reload
+        self.recorded = 0
+        self.flushed = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def _read(self, db) -> dict:
+        rows = db.execute(select(_projects.c.id, _projects.c.title, _projects.c.views)).all()
+        return {row.id: (row.title, row.views or 0) for row in rows}
+
+    def reload(self):
+        # The projects table is small, so the whole thing is re-read; this also
+        # picks up new and deleted projects and other workers' flushed counts
+        with self._flush_lock:
+            db = SessionLocal()
+            try:
+                stored = self._read(db)
+            finally:
+                db.close()
+            with self._lock:
+                self._stored = stored
+
+    def knows(self, project_id: int) -> bool:
+        return project_id in self._stored
+
+    def add_project(self, project_id: int, title: str, views: int):
+        with self._lock:
+            self._stored.setdefault(project_id, (title, views or 0))
+
+    def record(self, project_id: int, count: int = 1):
+        with self._lock:
+            self._pending[project_id] += count
+            self.recorded += count
+
+    def views(self, project_id: int) -> int:
+        with self._lock:
+            return self._total(project_id)
+
+    def _total(self, project_id: int) -> int:
+        stored = self._stored.get(project_id, (None, 0))[1]
+        return stored + self._in_flight[project_id] + self._pending[project_id]
+
+    def top(self, limit: int = 5) -> list:
+        with self._lock:
+            ranked = heapq.nlargest(
+                limit, self._stored, key=lambda project_id: (self._total(project_id), -project_id)
+            )
+            return [
+                {"id": project_id, "title": self._stored[project_id][0], "views": self._total(project_id)}
+                for project_id in ranked
+            ]
+
+    def flush(self):
+        # Writes this process's pending counts, then re-reads the stored
+        # totals so counts flushed by other workers show up too
+        with self._flush_lock:
+            with self._lock:
+                self._in_flight, self._pending = self._pending, Counter()
+            batch = [
+                {"project_id": project_id, "increment": count}
+                for project_id, count in self._in_flight.items()
+            ]
+
+            db = SessionLocal()
+            try:
+                if batch:
+                    try:
+                        db.execute(_INCREMENT, batch)
+                        db.commit()
+                    except Exception as e:
+                        db.rollback()
+                        # Put the counts back so the next flush retries them
+                        with self._lock:
+                            self._pending.update(self._in_flight)
+                            self._in_flight = Counter()
+                        self.failed += 1
+                        logger.error(f"Error flushing views for {len(batch)} projects: {str(e)}")
+                        return
+                    self.flushed += sum(entry["increment"] for entry in batch)
+                    self.flushes += 1
+
+                try:
+                    stored = self._read(db)
+                except Exception as e:
+                    logger.error(f"Error reloading project views: {str(e)}")
+                    stored = None
+            finally:
+                db.close()
+
+            with self._lock:
+                if stored is None:
+                    # Written but not re-read: fold the batch into the old totals
+                    stored = dict(self._stored)
+                    for project_id, count in self._in_flight.items():
+                        if project_id in stored:
+                            title, views = stored[project_id]
+                            stored[project_id] = (title, views + count)
+                # The new totals include the batch just written
+                self._stored = stored
+                self._in_flight = Counter()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(self._pending.values())
+            projects = len(self._stored)
+        return {
+            "projects": projects,
+            "pending": pending,
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "flushes": self.flushes,
+        }
+
+
+view_counter = ProjectViewCounter()
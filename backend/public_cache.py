@@ -0,0 +1,137 @@
+import hashlib
+import os
+import threading
+from itertools import chain
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .cache import LRUCache
+
+PUBLIC_CACHE_SIZE = int(os.getenv("PUBLIC_CACHE_SIZE", "1000"))
+# Versions are per process: a write is seen at once by the worker that made
+# it, and by every other worker once their entries expire. Responses can be
+# at most PUBLIC_CACHE_TTL_SECONDS out of date.
+PUBLIC_CACHE_TTL_SECONDS = int(os.getenv("PUBLIC_CACHE_TTL_SECONDS", "10"))
+PUBLIC_CACHE_MAX_AGE = int(os.getenv("PUBLIC_CACHE_MAX_AGE", "0"))
+
+
+class EntityVersions:
+    # Per-table counters bumped whenever a committed transaction wrote to the
+    # table. Cached responses remember the versions they were built from.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def track(self, *tables: str):
+        with self._lock:
+            for table in tables:
+                self._versions.setdefault(table, 0)
+
+    def is_tracked(self, table: str) -> bool:
+        return table in self._versions
+
+    def get(self, table: str) -> int:
+        return self._versions.get(table, 0)
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                if table in self._versions:
+                    self._versions[table] += 1
+
+    def snapshot(self) -> dict:
+        return dict(self._versions)
+
+
+versions = EntityVersions()
+
+
+def _touch(session: Session, table_name: str):
+    if versions.is_tracked(table_name):
+        session.info.setdefault("touched_tables", set()).add(table_name)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    for instance in chain(session.new, session.dirty, session.deleted):
+        _touch(session, instance.__table__.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_tables(orm_execute_state):
+    # Bulk insert()/update()/delete() statements bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _touch(orm_execute_state.session, table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    touched = session.info.pop("touched_tables", None)
+    if touched:
+        versions.bump(touched)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_tables(session):
+    session.info.pop("touched_tables", None)
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int, ttl: int):
+        self.ttl = ttl
+        self._cache = LRUCache(maxsize, ttl=ttl)
+
+    def get_or_build(self, key, tables, build, ttl: int = None):
+        # A per-call ttl may only shorten the staleness bound
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        # Read versions before building so a write racing with the build
+        # leaves an entry that is already out of date, never a stale "current" one
+        version = tuple(versions.get(table) for table in tables)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1], entry[2]
+
+        body = build()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        self._cache.set(key, (version, etag, body), ttl=ttl)
+        return etag, body
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+response_cache = ResponseCache(PUBLIC_CACHE_SIZE, PUBLIC_CACHE_TTL_SECONDS)
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def cached_json_response(
+    request: Request,
+    key,
+    tables,
+    build,
+    ttl: int = None,
+    cache_control: str = None,
+) -> Response:
+    etag, body = response_cache.get_or_build(key, tables, build, ttl=ttl)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control or f"public, max-age={PUBLIC_CACHE_MAX_AGE}, must-revalidate",
+    }
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,377 @@
+import ipaddress
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from .cache import LRUCache
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# memory: per-process token buckets (limits multiply with WEB_CONCURRENCY)
+# sqlite: one file shared by every worker on the host
+# redis:  shared by every worker on every host
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "ratelimit.sqlite3")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+# Reverse proxies allowed to set X-Forwarded-For, e.g. "127.0.0.1,10.0.0.0/8".
+# Without it every visitor behind the proxy shares the proxy's address.
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(value.strip(), strict=False)
+    for value in os.getenv("TRUSTED_PROXIES", "").split(",")
+    if value.strip()
+]
+
+Rate = namedtuple("Rate", ["limit", "period"])
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rate: str) -> Rate:
+    # "5/minute", "100/hour", "10/second"
+    limit, _, period = rate.partition("/")
+    period = period.strip().lower().rstrip("s")
+    if period not in _PERIODS:
+        raise ValueError(f"Unknown rate period in {rate!r}")
+    return Rate(int(limit), _PERIODS[period])
+
+
+class MemoryBackend:
+    # Buckets, counters and blocks live in size-bounded LRU maps whose entries
+    # expire once they would be indistinguishable from a fresh key.
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self._lock = threading.Lock()
+        self._buckets = LRUCache(max_keys)
+        self._counters = LRUCache(max_keys)
+        self._blocks = LRUCache(max_keys)
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / refill_per_second
+            self._buckets.set(key, (tokens, now), ttl=(capacity - tokens) / refill_per_second + 1)
+        return retry_after
+
+    def incr(self, key: str, window: float) -> int:
+        now = time.monotonic()
+        with self._lock:
+            # The window starts at the first hit and isn't extended by later ones
+            count, expires_at = self._counters.get(key, (0, now + window))
+            count += 1
+            self._counters.set(key, (count, expires_at), ttl=max(0.001, expires_at - now))
+        return count
+
+    def reset(self, key: str):
+        self._counters.pop(key)
+
+    def block(self, key: str, seconds: float):
+        self._blocks.set(key, time.monotonic() + seconds, ttl=seconds)
+
+    def unblock(self, key: str):
+        self._blocks.pop(key)
+
+    def blocked_for(self, key: str) -> float:
+        until = self._blocks.get(key)
+        return max(0.0, until - time.monotonic()) if until is not None else 0.0
+
+    def stats(self) -> dict:
+        return {"buckets": len(self._buckets), "counters": len(self._counters), "blocks": len(self._blocks)}
+
+
+class SQLiteBackend:
+    # WAL-mode SQLite file shared by the local workers. Every operation is a
+    # single-row read-modify-write inside BEGIN IMMEDIATE; expired rows are
+    # purged at most once per purge_interval.
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH, purge_interval: float = 60):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = 0.0
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_counters "
+                "(key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_blocks (key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+            for table in ("rate_buckets", "rate_counters", "rate_blocks"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_expires ON {table} (expires)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _purge(self, now: float):
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        with self._transaction() as conn:
+            for table in ("rate_buckets", "rate_counters", "rate_blocks"):
+                conn.execute(f"DELETE FROM {table} WHERE expires <= ?", (now,))
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1) -> float:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - updated) * refill_per_second)
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / refill_per_second
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, expires) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (capacity - tokens) / refill_per_second + 1)
+            )
+        self._purge(now)
+        return retry_after
+
+    def incr(self, key: str, window: float) -> int:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT count, expires FROM rate_counters WHERE key = ?", (key,)).fetchone()
+            count, expires = (row[0] + 1, row[1]) if row and row[1] > now else (1, now + window)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_counters (key, count, expires) VALUES (?, ?, ?)",
+                (key, count, expires)
+            )
+        self._purge(now)
+        return count
+
+    def reset(self, key: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM rate_counters WHERE key = ?", (key,))
+
+    def block(self, key: str, seconds: float):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_blocks (key, expires) VALUES (?, ?)",
+                (key, time.time() + seconds)
+            )
+
+    def unblock(self, key: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM rate_blocks WHERE key = ?", (key,))
+
+    def blocked_for(self, key: str) -> float:
+        row = self._connection().execute("SELECT expires FROM rate_blocks WHERE key = ?", (key,)).fetchone()
+        return max(0.0, row[0] - time.time()) if row else 0.0
+
+    def stats(self) -> dict:
+        conn = self._connection()
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("rate_buckets", "rate_counters", "rate_blocks")
+        }
+
+
+class RedisBackend:
+    # Works with Redis and compatible servers (Valkey, KeyDB, DragonflyDB).
+    # The bucket update runs as one Lua script so it is atomic across hosts.
+    name = "redis"
+    blocking = True
+    prefix = "ratelimit:"
+
+    _TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the redis package")
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self._TAKE_SCRIPT)
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1) -> float:
+        return float(self._take(
+            keys=[f"{self.prefix}bucket:{key}"],
+            args=[capacity, refill_per_second, time.time(), cost]
+        ))
+
+    def incr(self, key: str, window: float) -> int:
+        name = f"{self.prefix}counter:{key}"
+        pipe = self._client.pipeline()
+        pipe.set(name, 0, px=int(window * 1000), nx=True)
+        pipe.incr(name)
+        return int(pipe.execute()[1])
+
+    def reset(self, key: str):
+        self._client.delete(f"{self.prefix}counter:{key}")
+
+    def block(self, key: str, seconds: float):
+        self._client.set(f"{self.prefix}block:{key}", 1, px=max(1, int(seconds * 1000)))
+
+    def unblock(self, key: str):
+        self._client.delete(f"{self.prefix}block:{key}")
+
+    def blocked_for(self, key: str) -> float:
+        ttl = self._client.pttl(f"{self.prefix}block:{key}")
+        return ttl / 1000 if ttl and ttl > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {}
+
+
+class RateLimiter:
+    # One service for request rate limits, failure counting and block lists.
+    # Keys are namespaced by the caller, e.g. "login:<ip>" or "ip:<ip>".
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._decisions = Counter()
+
+    def _count(self, decision: str):
+        with self._lock:
+            self._decisions[decision] += 1
+
+    async def run(self, func, *args):
+        # Shared backends do I/O; keep it off the event loop
+        if self.backend.blocking:
+            return await run_in_threadpool(func, *args)
+        return func(*args)
+
+    def hit(self, scope: str, key: str, rate: Rate) -> float:
+        # Returns 0 when allowed, otherwise seconds until a token is available
+        retry_after = self.backend.take(f"{scope}:{key}", rate.limit, rate.limit / rate.period)
+        self._count("limited" if retry_after else "allowed")
+        return retry_after
+
+    def blocked_for(self, key: str) -> float:
+        remaining = self.backend.blocked_for(key)
+        if remaining:
+            self._count("blocked")
+        return remaining
+
+    def block(self, key: str, seconds: float):
+        self.backend.block(key, seconds)
+        self._count("blocks")
+
+    def unblock(self, key: str):
+        self.backend.unblock(key)
+
+    def record_failure(self, key: str, limit: int, window: float, block_for: float) -> bool:
+        # Blocks `key` once it fails `limit` times within `window` seconds
+        if self.backend.incr(f"failures:{key}", window) < limit:
+            return False
+        self.backend.reset(f"failures:{key}")
+        self.block(key, block_for)
+        return True
+
+    def clear_failures(self, key: str):
+        self.backend.reset(f"failures:{key}")
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "decisions": dict(self._decisions),
+            **self.backend.stats(),
+        }
+
+
+def create_backend(name: str = RATE_LIMIT_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "redis":
+        return RedisBackend()
+    raise ValueError("RATE_LIMIT_BACKEND must be one of memory, sqlite, redis")
+
+
+rate_limiter = RateLimiter(create_backend())
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    host = request.client.host if request.client else "unknown"
+    if not TRUSTED_PROXIES or not _is_trusted_proxy(host):
+        return host
+    # The nearest address our own proxies didn't add; entries further left
+    # are whatever the client chose to send
+    forwarded = [value.strip() for value in request.headers.get("x-forwarded-for", "").split(",") if value.strip()]
+    for candidate in reversed(forwarded):
+        if not _is_trusted_proxy(candidate):
+            return candidate
+    return host
+
+
+def rate_limit(scope: str, rate: str):
+    # Route dependency: @app.post(..., dependencies=[Depends(rate_limit("login", "5/minute"))])
+    parsed = parse_rate(rate)
+
+    def dependency(request: Request):
+        retry_after = rate_limiter.hit(scope, client_ip(request), parsed)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded: {rate}",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    return dependency
@@ -0,0 +1,284 @@
+import argparse
+import csv
+import gzip
+import logging
+import os
+import re
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import MetaData, func
+
+from . import models, partitions
+from .database import SessionLocal, engine
+from .rollups import PAGE_VIEWS, VISITOR_SESSIONS, VISITOR_SESSIONS_COMPACTED, lock_state, read_watermark
+
+logger = logging.getLogger(__name__)
+
+PAGE_VIEW_RETENTION_DAYS = int(os.getenv("PAGE_VIEW_RETENTION_DAYS", "90"))
+PAGE_VIEW_RETENTION_INTERVAL = float(os.getenv("PAGE_VIEW_RETENTION_INTERVAL", "86400"))
+PAGE_VIEW_ARCHIVE_DIR = os.getenv("PAGE_VIEW_ARCHIVE_DIR", "archive/page_views")
+PAGE_VIEW_PARTITION_MONTHS_AHEAD = int(os.getenv("PAGE_VIEW_PARTITION_MONTHS_AHEAD", "3"))
+RETENTION_CHUNK_SIZE = int(os.getenv("RETENTION_CHUNK_SIZE", "10000"))
+# Matches the session cookie's max_age: a session idle this long can't come back
+VISITOR_SESSION_RETENTION_DAYS = int(os.getenv("VISITOR_SESSION_RETENTION_DAYS", "30"))
+VISITOR_SESSION_COMPACTION_INTERVAL = float(os.getenv("VISITOR_SESSION_COMPACTION_INTERVAL", "86400"))
+
+ARCHIVE_COLUMNS = [column.name for column in models.PageView.__table__.columns]
+_ARCHIVE_NAME_RE = re.compile(r"^page_views_(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})\.csv\.gz$")
+
+# A slice of page_views to archive: rows with start <= created_at < end
+# (start is None for the oldest partition). partition is None when the
+# table isn't partitioned and the rows are deleted instead.
+ArchiveRange = namedtuple("ArchiveRange", ["start", "end", "partition"])
+
+# rehydrate drops and recreates its table, so it only touches names with
+# this suffix that no model uses
+REHYDRATED_SUFFIX = "_rehydrated"
+_SCRATCH_TABLE_RE = re.compile(r"^[A-Za-z0-9_]+" + REHYDRATED_SUFFIX + "$")
+
+
+def _as_datetime(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def archive_path(start: date, end: date, archive_dir: str = PAGE_VIEW_ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, f"page_views_{start.isoformat()}_{end.isoformat()}.csv.gz")
+
+
+def _expired_ranges(cutoff: date) -> list:
+    with engine.connect() as conn:
+        if partitions.is_partitioned(conn, PAGE_VIEWS):
+            ranges = []
+            start = None
+            for partition in partitions.list_partitions(conn, PAGE_VIEWS):
+                if partition.upper_bound is None or partition.upper_bound > cutoff:
+                    break
+                ranges.append(ArchiveRange(start, partition.upper_bound, partition.name))
+                start = partition.upper_bound
+            return ranges
+
+    # Unpartitioned: whole calendar months, oldest first
+    db = SessionLocal()
+    try:
+        oldest = db.query(func.min(models.PageView.created_at)).scalar()
+    finally:
+        db.close()
+    if oldest is None:
+        return []
+    ranges = []
+    month = partitions.month_start(oldest.date())
+    while partitions.next_month(month) <= cutoff:
+        ranges.append(ArchiveRange(month, partitions.next_month(month), None))
+        month = partitions.next_month(month)
+    return ranges
+
+
+def _range_filter(query, start, end):
+    if start is not None:
+        query = query.filter(models.PageView.created_at >= _as_datetime(start))
+    return query.filter(models.PageView.created_at < _as_datetime(end))
+
+
+def _export(db, archive_range: ArchiveRange, path: str) -> int:
+    # Written to a temp file and renamed so a crash never leaves a truncated archive
+    query = _range_filter(db.query(models.PageView.__table__), archive_range.start, archive_range.end)
+    rows = 0
+    temp_path = f"{path}.part"
+    with gzip.open(temp_path, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(ARCHIVE_COLUMNS)
+        for row in query.order_by(models.PageView.id).yield_per(RETENTION_CHUNK_SIZE):
+            writer.writerow([
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in row
+            ])
+            rows += 1
+    os.replace(temp_path, path)
+    return rows
+
+
+def _delete_range(db, archive_range: ArchiveRange) -> int:
+    deleted = 0
+    while True:
+        ids = [row.id for row in _range_filter(
+            db.query(models.PageView.id), archive_range.start, archive_range.end
+        ).order_by(models.PageView.id).limit(RETENTION_CHUNK_SIZE).all()]
+        if not ids:
+            return deleted
+        db.query(models.PageView).filter(models.PageView.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+
+
+def archive_page_views(now: datetime = None, archive_dir: str = PAGE_VIEW_ARCHIVE_DIR) -> list:
+    # Export raw page views older than the retention window to CSV.gz and
+    # remove them from MySQL. Only rows already counted by the rollups are
+    # touched, so the analytics totals are unaffected.
+    now = now or datetime.utcnow()
+    cutoff = now.date() - timedelta(days=PAGE_VIEW_RETENTION_DAYS)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    with engine.connect() as conn:
+        if partitions.is_partitioned(conn, PAGE_VIEWS):
+            created = partitions.ensure_future_partitions(
+                conn, PAGE_VIEWS, (now + timedelta(days=31 * PAGE_VIEW_PARTITION_MONTHS_AHEAD)).date()
+            )
+            if created:
+                logger.info(f"Created page_views partitions: {', '.join(created)}")
+
+    archived = []
+    db = SessionLocal()
+    try:
+        watermark = read_watermark(db, PAGE_VIEWS)
+        for archive_range in _expired_ranges(cutoff):
+            newest_id = _range_filter(
+                db.query(func.max(models.PageView.id)), archive_range.start, archive_range.end
+            ).scalar()
+            if newest_id is not None and newest_id > watermark:
+                logger.warning(
+                    f"Page views before {archive_range.end} are not rolled up yet; archiving stopped"
+                )
+                break
+
+            start = archive_range.start or date.min
+            path = archive_path(start, archive_range.end, archive_dir)
+            rows = _export(db, archive_range, path)
+            db.rollback()  # end the read transaction before dropping/deleting
+
+            if archive_range.partition is not None:
+                with engine.connect() as conn:
+                    partitions.drop_partitions(conn, PAGE_VIEWS, [archive_range.partition])
+            else:
+                _delete_range(db, archive_range)
+
+            logger.info(f"Archived {rows} page views to {path}")
+            archived.append({"path": path, "rows": rows})
+    finally:
+        db.close()
+    return archived
+
+
+def compact_visitor_sessions(now: datetime = None) -> int:
+    # Delete sessions idle for longer than the retention window. Only rows
+    # already counted by the visitor rollups are touched, so the visitor
+    # totals and breakdowns are unaffected; unique visitors come from the
+    # HyperLogLog sketches (see unique_visitors.py).
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=VISITOR_SESSION_RETENTION_DAYS)
+    deleted = 0
+    db = SessionLocal()
+    try:
+        watermark = read_watermark(db, VISITOR_SESSIONS)
+
+        # Compacted sessions all started before this day, so a rollup
+        # backfill must keep the counts for earlier days
+        state = lock_state(db, VISITOR_SESSIONS_COMPACTED)
+        state.last_id = max(state.last_id, (cutoff.date() + timedelta(days=1)).toordinal())
+        db.commit()
+
+        while True:
+            # No ORDER BY, so the scan runs on the last_visit index
+            ids = [row.id for row in db.query(models.VisitorSession.id).filter(
+                models.VisitorSession.last_visit < cutoff,
+                models.VisitorSession.id <= watermark
+            ).limit(RETENTION_CHUNK_SIZE).all()]
+            if not ids:
+                break
+            db.query(models.VisitorSession).filter(
+                models.VisitorSession.id.in_(ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+            deleted += len(ids)
+    finally:
+        db.close()
+    if deleted:
+        logger.info(f"Compacted {deleted} visitor sessions idle since before {cutoff.date()}")
+    return deleted
+
+
+def archives_between(start: date, end: date, archive_dir: str = PAGE_VIEW_ARCHIVE_DIR) -> list:
+    found = []
+    if not os.path.isdir(archive_dir):
+        return found
+    for name in sorted(os.listdir(archive_dir)):
+        match = _ARCHIVE_NAME_RE.match(name)
+        if not match:
+            continue
+        file_start, file_end = (date.fromisoformat(value) for value in match.groups())
+        if file_start < end and file_end > start:
+            found.append(os.path.join(archive_dir, name))
+    return found
+
+
+def _parse(column: str, value: str):
+    if value == "":
+        return None
+    if column == "id":
+        return int(value)
+    if column == "created_at":
+        return datetime.fromisoformat(value)
+    return value
+
+
+def rehydrate(start: date, end: date, table_name: str = "page_views_rehydrated",
+              archive_dir: str = PAGE_VIEW_ARCHIVE_DIR) -> int:
+    # Load archived rows with start <= created_at < end into a scratch table
+    # shaped like page_views, for ad-hoc queries. The scratch table is
+    # recreated on every run; live tables are refused.
+    if not _SCRATCH_TABLE_RE.match(table_name) or table_name in models.Base.metadata.tables:
+        raise ValueError(f"Scratch table name must end with {REHYDRATED_SUFFIX!r} and not be a model table")
+    table = models.PageView.__table__.to_metadata(MetaData(), name=table_name)
+    # Index names are per schema on some databases (SQLite, PostgreSQL)
+    for index in table.indexes:
+        index.name = index.name.replace(models.PageView.__tablename__, table_name, 1)
+    table.drop(bind=engine, checkfirst=True)
+    table.create(bind=engine)
+
+    loaded = 0
+    start_at, end_at = _as_datetime(start), _as_datetime(end)
+    with engine.begin() as conn:
+        for path in archives_between(start, end, archive_dir):
+            with gzip.open(path, "rt", newline="") as f:
+                reader = csv.DictReader(f)
+                batch = []
+                for record in reader:
+                    row = {column: _parse(column, record.get(column, "")) for column in ARCHIVE_COLUMNS}
+                    created_at = row["created_at"]
+                    if created_at is None or not (start_at <= created_at.replace(tzinfo=None) < end_at):
+                        continue
+                    batch.append(row)
+                    if len(batch) >= RETENTION_CHUNK_SIZE:
+                        conn.execute(table.insert(), batch)
+                        loaded += len(batch)
+                        batch = []
+                if batch:
+                    conn.execute(table.insert(), batch)
+                    loaded += len(batch)
+    return loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive and rehydrate raw page views, compact visitor sessions")
+    parser.add_argument("command", choices=["archive", "rehydrate", "compact-sessions"])
+    parser.add_argument("--start", type=date.fromisoformat, help="rehydrate: first day (inclusive)")
+    parser.add_argument("--end", type=date.fromisoformat, help="rehydrate: last day (exclusive)")
+    parser.add_argument("--table", default="page_views_rehydrated", help=f"rehydrate: scratch table name, ending in {REHYDRATED_SUFFIX}")
+    parser.add_argument("--archive-dir", default=PAGE_VIEW_ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    models.Base.metadata.create_all(bind=engine)
+    if args.command == "archive":
+        for archive in archive_page_views(archive_dir=args.archive_dir):
+            print(f"{archive['path']}: {archive['rows']} rows")
+    elif args.command == "compact-sessions":
+        print(f"Deleted {compact_visitor_sessions()} stale visitor sessions")
+    else:
+        if not args.start or not args.end:
+            parser.error("rehydrate needs --start and --end")
+        try:
+            loaded = rehydrate(args.start, args.end, table_name=args.table, archive_dir=args.archive_dir)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Loaded {loaded} page views into {args.table}")
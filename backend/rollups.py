@@ -0,0 +1,287 @@
+import argparse
+import logging
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, desc
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_INTERVAL_SECONDS = float(os.getenv("ROLLUP_INTERVAL_SECONDS", "60"))
+ROLLUP_CHUNK_SIZE = int(os.getenv("ROLLUP_CHUNK_SIZE", "50000"))
+# Raw rows younger than this are left for the next run so that transactions
+# still in flight (lower ids committed late) are never skipped.
+ROLLUP_SETTLE_SECONDS = int(os.getenv("ROLLUP_SETTLE_SECONDS", "60"))
+
+PAGE_VIEWS = "page_views"
+VISITOR_SESSIONS = "visitor_sessions"
+# last_id holds a date ordinal: visitor rollup days before it include
+# sessions that retention.compact_visitor_sessions has since deleted
+VISITOR_SESSIONS_COMPACTED = "visitor_sessions_compacted"
+
+
+def _hour_bucket(column):
+    return func.date_format(column, "%Y-%m-%d %H:00:00")
+
+
+def _page_view_counts(db: Session, after_id: int, upto_id: int = None):
+    bucket = _hour_bucket(models.PageView.created_at)
+    query = db.query(
+        bucket,
+        models.PageView.page_path,
+        func.count(models.PageView.id)
+    ).filter(models.PageView.id > after_id)
+    if upto_id is not None:
+        query = query.filter(models.PageView.id <= upto_id)
+    return query.group_by(bucket, models.PageView.page_path).all()
+
+
+def _visitor_counts(db: Session, after_id: int, upto_id: int = None, since: datetime = None):
+    dims = (
+        func.date(models.VisitorSession.first_visit),
+        func.coalesce(models.VisitorSession.device_type, ""),
+        func.coalesce(models.VisitorSession.browser, ""),
+        func.coalesce(models.VisitorSession.os, ""),
+        func.coalesce(models.VisitorSession.country, ""),
+    )
+    query = db.query(
+        *dims,
+        func.count(models.VisitorSession.id)
+    ).filter(models.VisitorSession.id > after_id)
+    if upto_id is not None:
+        query = query.filter(models.VisitorSession.id <= upto_id)
+    if since is not None:
+        query = query.filter(models.VisitorSession.first_visit >= since)
+    return query.group_by(*dims).all()
+
+
+def lock_state(db: Session, name: str) -> models.RollupState:
+    state = db.query(models.RollupState).filter(
+        models.RollupState.name == name
+    ).with_for_update().first()
+    if state is None:
+        db.execute(mysql_insert(models.RollupState).values(name=name, last_id=0).prefix_with("IGNORE"))
+        state = db.query(models.RollupState).filter(
+            models.RollupState.name == name
+        ).with_for_update().first()
+    return state
+
+
+def _next_upper_id(db: Session, model, created_column, after_id: int, chunk_size: int, cutoff: datetime):
+    ids = db.query(model.id).filter(
+        model.id > after_id,
+        created_column < cutoff
+    ).order_by(model.id).limit(chunk_size).subquery()
+    return db.query(func.max(ids.c.id)).scalar()
+
+
+def _roll_page_views(db: Session, chunk_size: int, cutoff: datetime) -> bool:
+    state = lock_state(db, PAGE_VIEWS)
+    upto_id = _next_upper_id(db, models.PageView, models.PageView.created_at, state.last_id, chunk_size, cutoff)
+    if upto_id is None:
+        db.rollback()
+        return False
+
+    rows = [
+        {"bucket": bucket, "page_path": path or "", "views": count}
+        for bucket, path, count in _page_view_counts(db, state.last_id, upto_id)
+    ]
+    if rows:
+        upsert = mysql_insert(models.PageViewRollup).values(rows)
+        upsert = upsert.on_duplicate_key_update(
+            views=models.PageViewRollup.views + upsert.inserted.views
+        )
+        db.execute(upsert)
+
+    # The watermark moves in the same transaction as the counts it covers
+    state.last_id = upto_id
+    db.commit()
+    return True
+
+
+def _roll_visitor_sessions(db: Session, chunk_size: int, cutoff: datetime, since: datetime = None) -> bool:
+    state = lock_state(db, VISITOR_SESSIONS)
+    upto_id = _next_upper_id(db, models.VisitorSession, models.VisitorSession.first_visit, state.last_id, chunk_size, cutoff)
+    if upto_id is None:
+        db.rollback()
+        return False
+
+    rows = [
+        {"day": day, "device_type": device, "browser": browser, "os": os_name, "country": country, "visitors": count}
+        for day, device, browser, os_name, country, count in _visitor_counts(db, state.last_id, upto_id, since)
+    ]
+    if rows:
+        upsert = mysql_insert(models.VisitorRollup).values(rows)
+        upsert = upsert.on_duplicate_key_update(
+            visitors=models.VisitorRollup.visitors + upsert.inserted.visitors
+        )
+        db.execute(upsert)
+
+    state.last_id = upto_id
+    db.commit()
+    return True
+
+
+def refresh_rollups(chunk_size: int = ROLLUP_CHUNK_SIZE, settle_seconds: int = ROLLUP_SETTLE_SECONDS,
+                    visitors_since: datetime = None):
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    db = SessionLocal()
+    try:
+        while _roll_page_views(db, chunk_size, cutoff):
+            pass
+        while _roll_visitor_sessions(db, chunk_size, cutoff, visitors_since):
+            pass
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def backfill(chunk_size: int = ROLLUP_CHUNK_SIZE):
+    # Rebuild every rollup from the raw tables
+    db = SessionLocal()
+    try:
+        states = [lock_state(db, name) for name in (PAGE_VIEWS, VISITOR_SESSIONS)]
+        # Hours whose raw page views were archived (see retention.py) keep their counts
+        oldest = db.query(func.min(models.PageView.created_at)).scalar()
+        page_view_rollups = db.query(models.PageViewRollup)
+        if oldest is not None:
+            page_view_rollups = page_view_rollups.filter(
+                models.PageViewRollup.bucket >= oldest.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+            )
+        page_view_rollups.delete(synchronize_session=False)
+        # Likewise days whose sessions were compacted; sessions that started
+        # on those days and are still stored are already counted there
+        compacted = read_watermark(db, VISITOR_SESSIONS_COMPACTED)
+        visitors_since = datetime.combine(date.fromordinal(compacted), datetime.min.time()) if compacted else None
+        visitor_rollups = db.query(models.VisitorRollup)
+        if visitors_since is not None:
+            visitor_rollups = visitor_rollups.filter(models.VisitorRollup.day >= visitors_since.date())
+        visitor_rollups.delete(synchronize_session=False)
+        for state in states:
+            state.last_id = 0
+        db.commit()
+    finally:
+        db.close()
+    refresh_rollups(chunk_size=chunk_size, visitors_since=visitors_since)
+
+
+def read_watermark(db: Session, name: str) -> int:
+    return db.query(models.RollupState.last_id).filter(
+        models.RollupState.name == name
+    ).scalar() or 0
+
+
+def page_view_stats(db: Session, top: int = 10) -> dict:
+    watermark = read_watermark(db, PAGE_VIEWS)
+
+    # Raw rows newer than the watermark haven't been rolled up yet
+    tail = Counter()
+    for bucket, path, count in _page_view_counts(db, watermark):
+        tail[path or ""] += count
+
+    total = db.query(func.sum(models.PageViewRollup.views)).scalar() or 0
+    total += sum(tail.values())
+
+    views = func.sum(models.PageViewRollup.views).label("views")
+    by_path = Counter(dict(
+        db.query(models.PageViewRollup.page_path, views)
+        .group_by(models.PageViewRollup.page_path)
+        .order_by(desc("views"))
+        .limit(top)
+        .all()
+    ))
+    if tail:
+        # Paths in the tail may come from outside the rolled-up top N
+        by_path.update(dict(
+            db.query(models.PageViewRollup.page_path, views)
+            .filter(models.PageViewRollup.page_path.in_(list(tail)))
+            .filter(models.PageViewRollup.page_path.notin_(list(by_path)))
+            .group_by(models.PageViewRollup.page_path)
+            .all()
+        ))
+        by_path.update(tail)
+
+    return {
+        "total_page_views": int(total),
+        "top_pages": [{"path": path, "views": int(count)} for path, count in by_path.most_common(top)],
+    }
+
+
+def visitor_stats(db: Session, trend_days: int = 7) -> dict:
+    watermark = read_watermark(db, VISITOR_SESSIONS)
+    today = datetime.utcnow().date()
+    since = today - timedelta(days=trend_days - 1)
+
+    visitors = func.sum(models.VisitorRollup.visitors)
+    combos = db.query(
+        models.VisitorRollup.device_type,
+        models.VisitorRollup.browser,
+        models.VisitorRollup.os,
+        models.VisitorRollup.country,
+        visitors
+    ).group_by(
+        models.VisitorRollup.device_type,
+        models.VisitorRollup.browser,
+        models.VisitorRollup.os,
+        models.VisitorRollup.country
+    ).all()
+    per_day = Counter(dict(
+        db.query(models.VisitorRollup.day, visitors)
+        .filter(models.VisitorRollup.day >= since)
+        .group_by(models.VisitorRollup.day)
+        .all()
+    ))
+
+    combos = [tuple(row) for row in combos]
+    for day, device, browser, os_name, country, count in _visitor_counts(db, watermark):
+        combos.append((device, browser, os_name, country, count))
+        per_day[day] += count
+
+    total = 0
+    device_stats, browser_stats, os_stats, country_stats = Counter(), Counter(), Counter(), Counter()
+    for device, browser, os_name, country, count in combos:
+        count = int(count)
+        total += count
+        device_stats[device] += count
+        browser_stats[browser] += count
+        os_stats[os_name] += count
+        if country:
+            country_stats[country] += count
+
+    visitor_trends = []
+    for i in range(trend_days):
+        day = today - timedelta(days=i)
+        visitor_trends.append({"date": day.isoformat(), "count": int(per_day.get(day, 0))})
+
+    return {
+        "total_visitors": total,
+        "visitor_trends": visitor_trends,
+        "device_stats": dict(device_stats),
+        "browser_stats": dict(browser_stats),
+        "os_stats": dict(os_stats),
+        "country_stats": dict(country_stats),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain analytics rollup tables")
+    parser.add_argument("command", choices=["backfill", "refresh"])
+    parser.add_argument("--chunk-size", type=int, default=ROLLUP_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    models.Base.metadata.create_all(bind=engine)
+    if args.command == "backfill":
+        print("Rebuilding rollups from raw page views and visitor sessions...")
+        backfill(chunk_size=args.chunk_size)
+    else:
+        refresh_rollups(chunk_size=args.chunk_size)
+    print("Rollups are up to date!")
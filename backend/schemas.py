@@ -1,7 +1,14 @@
 from pydantic import BaseModel, EmailStr, HttpUrl
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Generic, TypeVar
 from datetime import datetime
 
+T = TypeVar("T")
+
+# Pagination schemas
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[int] = None
+
 # User schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -84,6 +91,7 @@ class GalleryItemCreate(GalleryItemBase):
 
 class GalleryItem(GalleryItemBase):
     id: int
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -176,7 +184,7 @@ class Subscriber(SubscriberBase):
     id: int
     is_active: bool
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -209,6 +217,11 @@ class Project(ProjectBase):
     class Config:
         from_attributes = True
 
+class ProjectViews(BaseModel):
+    id: int
+    title: Optional[str] = None
+    views: int
+
 class SkillBase(BaseModel):
     name: str
     category: str
@@ -296,16 +309,24 @@ class AdminLog(AdminLogBase):
 class Statistics(BaseModel):
     total_visitors: int
     unique_visitors: int
+    unique_visitors_daily: int = 0
+    unique_visitors_weekly: int = 0
+    unique_visitors_monthly: int = 0
     total_page_views: int
     total_contacts: int
     total_subscribers: int
-    visitor_trends: List[Dict[str, int]]
-    top_pages: List[Dict[str, int]]
+    visitor_trends: List[Dict[str, Any]]
+    top_pages: List[Dict[str, Any]]
     device_stats: Dict[str, int]
     browser_stats: Dict[str, int]
     os_stats: Dict[str, int]
     country_stats: Dict[str, int]
 
+class UniqueVisitors(BaseModel):
+    daily: int
+    weekly: int
+    monthly: int
+
 # Theme settings schemas
 class ThemeSettingsBase(BaseModel):
     primary_color: str
@@ -340,4 +361,18 @@ class SocialMedia(SocialMediaBase):
     updated_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+# Site config document
+class SiteConfig(BaseModel):
+    theme: Optional[ThemeSettings] = None
+    social_media: List[SocialMedia]
+    notifications: List[Notification]
+
+class SearchResult(BaseModel):
+    type: str
+    id: int
+    title: str
+    section: Optional[str] = None
+    snippet: str
+    score: float
\ No newline at end of file
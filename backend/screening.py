@@ -0,0 +1,320 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter, namedtuple
+from typing import Optional
+from urllib.parse import unquote_plus
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+SCREENING_RULES_FILE = os.getenv("SCREENING_RULES_FILE", "")
+SCREENING_RELOAD_INTERVAL = float(os.getenv("SCREENING_RELOAD_INTERVAL", "30"))
+SCREENING_HEADERS = [
+    header.strip().lower()
+    for header in os.getenv("SCREENING_HEADERS", "user-agent,referer,x-forwarded-for").split(",")
+    if header.strip()
+]
+
+Rule = namedtuple("Rule", ["name", "pattern"])
+
+DEFAULT_RULES = [
+    Rule("directory_traversal", r"\.\./"),
+    Rule("directory_traversal", r"\.\.\\"),
+    Rule("xss", r"<script"),
+    Rule("xss", r"javascript:"),
+    # Only as an attribute inside a tag, not the word in a search
+    Rule("xss", r"<[^>]*onerror\s*="),
+    Rule("sql_injection", r"UNION\s+(?:ALL\s+)?SELECT"),
+    # Time-based probes like "1 AND SLEEP(5)", not "sleep(8 hours)"
+    Rule("sql_injection", r"\b(?:and|or|select)\s+sleep\s*\(\s*\d+\s*\)"),
+    Rule("sql_injection", r"information_schema"),
+    # Calls with a string or variable argument, not "python exec()"
+    Rule("command_injection", r"exec\s*\(\s*['\"$]"),
+    Rule("command_injection", r"system\s*\(\s*['\"$]"),
+    Rule("sensitive_file", r"/etc/passwd"),
+    Rule("sensitive_file", r"\.env\b"),
+    Rule("sensitive_file", r"\.git/"),
+    Rule("log4shell", r"\$\{jndi:"),
+]
+
+_OPTIONAL_QUANTIFIERS = set("*?{")
+_QUANTIFIERS = set("*+?{")
+
+
+def is_public_read(request: Request) -> bool:
+    # Public GETs take free text in the query string (search boxes), so rule
+    # matches there are logged rather than blocked
+    return request.method in ("GET", "HEAD") and not request.url.path.startswith("/api/admin")
+
+
+def _skip_group(pattern: str, i: int) -> int:
+    # Index just past the group or class that starts at pattern[i]
+    depth = 0
+    in_class = pattern[i] == "["
+    i += 1
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if in_class:
+            if char == "]":
+                return i + 1
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            if depth == 0:
+                return i + 1
+            depth -= 1
+        i += 1
+    return i
+
+
+def _escape_width(pattern: str, i: int) -> int:
+    # Length of a \d, \x41, \u00e9, \N{...} or \12 style escape at pattern[i]
+    escaped = pattern[i + 1:i + 2]
+    if escaped == "x":
+        return 4
+    if escaped == "u":
+        return 6
+    if escaped == "U":
+        return 10
+    if escaped == "N" and "}" in pattern[i:]:
+        return pattern.find("}", i) - i + 1
+    width = 2
+    if escaped.isdigit():
+        while pattern[i + width:i + width + 1].isdigit():
+            width += 1
+    return width
+
+
+def required_literal(pattern: str) -> tuple:
+    # The longest run of literal text that every match of `pattern` must
+    # contain, and whether the match starts with it. Returns ("", False) when
+    # there is none, e.g. with top-level alternation.
+    runs = []
+    run, run_start = [], 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            literal, width = (escaped, 2) if escaped and not escaped.isalnum() else (None, _escape_width(pattern, i))
+        elif char in "[(":
+            literal, width = None, _skip_group(pattern, i) - i
+        elif char == "|":
+            return "", False
+        elif char in ".^$":
+            literal, width = None, 1
+        elif char in _QUANTIFIERS:
+            # Quantifiers on groups and classes; the token before already ended the run
+            literal, width = None, 1
+            if char == "{":
+                width = pattern.find("}", i) - i + 1 if "}" in pattern[i:] else 1
+        else:
+            literal, width = char, 1
+
+        quantifier = pattern[i + width:i + width + 1]
+        if literal is not None and quantifier not in _OPTIONAL_QUANTIFIERS:
+            run.append(literal)
+            if quantifier == "+":
+                # Required, but repetition breaks the contiguous run
+                runs.append(("".join(run), run_start))
+                run, run_start = [], i + width + 1
+        else:
+            runs.append(("".join(run), run_start))
+            run, run_start = [], i + width
+        i += width
+    runs.append(("".join(run), run_start))
+
+    prefix = runs[0][0] if runs[0][1] == 0 else ""
+    longest = max(runs, key=lambda item: len(item[0]))[0]
+    # Anchored confirmation is cheaper, so a usable prefix wins
+    if len(prefix) >= 3 or (prefix and len(prefix) >= len(longest)):
+        return prefix.lower(), True
+    return longest.lower(), False
+
+
+def _trie_pattern(keywords) -> str:
+    # One regex shaped like a trie, so the engine branches on each character
+    # instead of trying every keyword at every position
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if "" in node:
+            body = f"(?:{body})?"
+        return body
+
+    return emit(trie)
+
+
+class RuleSet:
+    # Every rule is keyed on a literal its matches must contain. One scan for
+    # all keywords finds the few places worth looking at, and only the rules
+    # keyed on a keyword that occurs are run: anchored at the hit when the
+    # keyword is the rule's prefix, over the whole text otherwise. Rules with
+    # no usable literal share one combined regex.
+
+    def __init__(self, rules: list):
+        self.rules = list(rules)
+        self._by_keyword = {}
+        fallback = []
+        for index, rule in enumerate(self.rules):
+            compiled = re.compile(rule.pattern, re.IGNORECASE)
+            keyword, is_prefix = required_literal(rule.pattern)
+            if len(keyword) >= 2:
+                self._by_keyword.setdefault(keyword, []).append((rule, compiled, is_prefix))
+            else:
+                if compiled.groupindex:
+                    raise ValueError(f"Rule {rule.name!r} without a literal can't use named groups")
+                fallback.append(f"(?P<r{index}>{rule.pattern})")
+
+        # A hit on "execute" also has to try the rules keyed on "exec"
+        self._candidates = {
+            keyword: [
+                candidate
+                for other, candidates in self._by_keyword.items()
+                if keyword.startswith(other)
+                for candidate in candidates
+            ]
+            for keyword in self._by_keyword
+        }
+        self._keywords = re.compile(_trie_pattern(self._by_keyword), re.IGNORECASE) if self._by_keyword else None
+        self._fallback = re.compile("|".join(fallback), re.IGNORECASE) if fallback else None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match(self, text: str) -> Optional[Rule]:
+        if self._keywords is not None:
+            searched = set()
+            position = 0
+            while True:
+                hit = self._keywords.search(text, position)
+                if hit is None:
+                    break
+                for rule, compiled, is_prefix in self._candidates.get(hit.group().lower(), ()):
+                    if is_prefix:
+                        if compiled.match(text, hit.start()):
+                            return rule
+                    elif id(compiled) not in searched:
+                        searched.add(id(compiled))
+                        if compiled.search(text):
+                            return rule
+                # Keywords may overlap, so resume one character later
+                position = hit.start() + 1
+        if self._fallback is not None:
+            found = self._fallback.search(text)
+            if found:
+                return self.rules[int(found.lastgroup[1:])]
+        return None
+
+
+def load_rules(path: str) -> list:
+    # [{"name": "sql_injection", "pattern": "UNION\\s+SELECT"}, ...]
+    with open(path) as f:
+        return [Rule(entry["name"], entry["pattern"]) for entry in json.load(f)]
+
+
+class ScreeningEngine:
+    def __init__(self, rules_file: str = SCREENING_RULES_FILE, headers: list = None):
+        self.rules_file = rules_file
+        self.headers = SCREENING_HEADERS if headers is None else headers
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.rule_set = RuleSet(DEFAULT_RULES)
+        self.matches = Counter()
+        self.scanned = 0
+        self.logged = 0
+        self.reloads = 0
+
+    def load(self, rules: list):
+        # Compiled before the swap: requests keep using the old set until the
+        # new one is ready, and a bad rule file leaves the old set in place
+        rule_set = RuleSet(rules)
+        self.rule_set = rule_set
+        self.reloads += 1
+
+    def reload_if_changed(self):
+        if not self.rules_file:
+            return
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.rules_file)
+            except OSError:
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                # File rules extend the built-in ones
+                self.load(DEFAULT_RULES + load_rules(self.rules_file))
+            except Exception as e:
+                logger.error(f"Error loading screening rules from {self.rules_file}: {str(e)}")
+            else:
+                logger.info(f"Loaded {len(self.rule_set)} screening rules from {self.rules_file}")
+            self._mtime = mtime
+
+    def scan_fields(self, fields) -> Optional[Rule]:
+        # Each field is matched on its own, so no rule can match across the
+        # end of one field and the start of the next
+        self.scanned += 1
+        for text in fields:
+            if not text:
+                continue
+            rule = self.rule_set.match(text)
+            if rule is not None:
+                self.matches[rule.name] += 1
+                return rule
+        return None
+
+    def scan_text(self, text: str) -> Optional[Rule]:
+        return self.scan_fields([text])
+
+    def scan(self, request: Request) -> Optional[Rule]:
+        # Path, decoded query string and selected headers
+        fields = [request.url.path, unquote_plus(request.url.query)]
+        fields.extend(request.headers.get(header, "") for header in self.headers)
+        return self.scan_fields(fields)
+
+    def screen(self, request: Request) -> Optional[Rule]:
+        # The rule the request should be blocked for, if any
+        fields = [request.url.path]
+        fields.extend(request.headers.get(header, "") for header in self.headers)
+        query = unquote_plus(request.url.query)
+        if not is_public_read(request):
+            fields.append(query)
+            query = ""
+        rule = self.scan_fields(fields)
+        if rule is None and query:
+            logged = self.rule_set.match(query)
+            if logged is not None:
+                self.logged += 1
+                logger.warning(f"Query string of {request.url.path} matches screening rule {logged.name}; not blocked")
+        return rule
+
+    def stats(self) -> dict:
+        return {
+            "rules": len(self.rule_set),
+            "scanned": self.scanned,
+            "matches": dict(self.matches),
+            "logged": self.logged,
+            "reloads": self.reloads,
+        }
+
+
+engine = ScreeningEngine()
@@ -0,0 +1,329 @@
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from typing import Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_WEIGHT = 2  # title terms count this many times towards term frequency
+MAX_PREFIX_EXPANSIONS = 50
+SNIPPET_LENGTH = 200
+# The index is per process and only sees this process's commits, so this
+# bounds how long another worker's write can be missing from search results
+# (two intervals for an edit made in the same second as a check)
+SEARCH_INDEX_CHECK_INTERVAL = float(os.getenv("SEARCH_INDEX_CHECK_INTERVAL", "30"))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the to was were will with".split()
+)
+
+# How each searchable model maps onto a document
+SearchSource = namedtuple("SearchSource", ["type", "title", "body", "section", "include"])
+
+SOURCES = {
+    models.Content: SearchSource(
+        "content", "title", ("content",), lambda row: row.section, lambda row: bool(row.is_published)
+    ),
+    models.Event: SearchSource("event", "title", ("description", "location"), None, None),
+    models.FAQ: SearchSource("faq", "question", ("answer",), None, None),
+    models.Course: SearchSource("course", "title", ("description",), lambda row: row.category, None),
+    models.Department: SearchSource("department", "name", ("description",), None, None),
+}
+
+SEARCH_TYPES = tuple(source.type for source in SOURCES.values())
+
+Document = namedtuple("Document", ["type", "id", "title", "section", "snippet", "length", "terms"])
+
+
+def tokenize(text: Optional[str]) -> list:
+    if not text:
+        return []
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def document_from_row(row) -> tuple:
+    source = SOURCES[type(row)]
+    key = (source.type, row.id)
+    if source.include is not None and not source.include(row):
+        return key, None
+    body = " ".join(getattr(row, field) or "" for field in source.body)
+    return key, {
+        "title": getattr(row, source.title) or "",
+        "body": body,
+        "section": source.section(row) if source.section else None,
+    }
+
+
+class SearchIndex:
+    # In-memory inverted index with BM25 ranking. Postings map each term to
+    # {doc_key: term frequency}; doc_key is (type, id).
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._docs = {}
+        self._total_length = 0
+        self._sorted_terms = None
+        self._signatures = {}  # model -> signature when its documents were loaded
+        self._unsettled = set()
+        self.rebuilds = 0
+        self.reloads = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, key: tuple, title: str, body: str, section: Optional[str] = None):
+        frequencies = Counter(tokenize(body))
+        for term in tokenize(title):
+            frequencies[term] += TITLE_WEIGHT
+        length = sum(frequencies.values())
+
+        with self._lock:
+            self._remove(key)
+            for term, count in frequencies.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._sorted_terms = None
+                postings[key] = count
+            self._docs[key] = Document(
+                type=key[0],
+                id=key[1],
+                title=title,
+                section=section,
+                snippet=body[:SNIPPET_LENGTH],
+                length=length,
+                terms=tuple(frequencies),
+            )
+            self._total_length += length
+
+    def remove(self, key: tuple):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: tuple):
+        document = self._docs.pop(key, None)
+        if document is None:
+            return
+        self._total_length -= document.length
+        for term in document.terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+                self._sorted_terms = None
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._docs.clear()
+            self._total_length = 0
+            self._sorted_terms = None
+
+    def apply(self, key: tuple, payload: Optional[dict]):
+        if payload is None:
+            self.remove(key)
+        else:
+            self.add(key, payload["title"], payload["body"], payload["section"])
+
+    def _expand_prefix(self, prefix: str) -> list:
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = []
+        index = bisect_left(self._sorted_terms, prefix)
+        while index < len(self._sorted_terms) and len(terms) < MAX_PREFIX_EXPANSIONS:
+            term = self._sorted_terms[index]
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+            index += 1
+        return terms
+
+    def search(
+        self,
+        query: str,
+        types: Optional[set] = None,
+        section: Optional[str] = None,
+        limit: int = 10,
+        prefix: bool = True,
+    ) -> list:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            doc_count = len(self._docs)
+            if not doc_count:
+                return []
+            average_length = self._total_length / doc_count
+
+            # The last token is matched as a prefix so partial words still hit
+            query_terms = set(tokens[:-1])
+            if prefix and not query.endswith(" "):
+                query_terms.update(self._expand_prefix(tokens[-1]) or [tokens[-1]])
+            else:
+                query_terms.add(tokens[-1])
+
+            scores = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for key, tf in postings.items():
+                    document = self._docs[key]
+                    if types and document.type not in types:
+                        continue
+                    if section and document.section != section:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * document.length / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [
+                {
+                    "type": self._docs[key].type,
+                    "id": self._docs[key].id,
+                    "title": self._docs[key].title,
+                    "section": self._docs[key].section,
+                    "snippet": self._docs[key].snippet,
+                    "score": round(score, 4),
+                }
+                for key, score in top
+            ]
+
+    def rebuild(self, db: Session, batch_size: int = 1000):
+        # Built aside and swapped in, so searches never see a half-built index
+        signatures = {model: _signature(db, model) for model in SOURCES}
+        fresh = SearchIndex()
+        for model in SOURCES:
+            for row in db.query(model).yield_per(batch_size):
+                key, payload = document_from_row(row)
+                fresh.apply(key, payload)
+        with self._lock:
+            self._postings = fresh._postings
+            self._docs = fresh._docs
+            self._total_length = fresh._total_length
+            self._sorted_terms = None
+            self._signatures = signatures
+            self._unsettled = set(SOURCES)
+            self.rebuilds += 1
+        logger.info(f"Search index built with {len(self)} documents and {len(self._postings)} terms")
+
+    def reload(self, db: Session, model, signature: tuple, batch_size: int = 1000):
+        # Replaces one table's documents; the rows are read before the lock is taken
+        source = SOURCES[model]
+        documents = [document_from_row(row) for row in db.query(model).yield_per(batch_size)]
+        with self._lock:
+            for key in [key for key in self._docs if key[0] == source.type]:
+                self._remove(key)
+            for key, payload in documents:
+                self.apply(key, payload)
+            # A changed table is read once more on the next check: an edit
+            # in the same second as this read leaves max(updated_at) as it was
+            if signature == self._signatures.get(model):
+                self._unsettled.discard(model)
+            else:
+                self._unsettled.add(model)
+            self._signatures[model] = signature
+            self.reloads += 1
+
+    def rebuild_if_stale(self, db: Session):
+        # Cheap per-table check; an insert or delete (here or in another
+        # worker) changes the row count or max id, an edit max(updated_at).
+        # Only the tables that changed are reloaded.
+        for model in SOURCES:
+            signature = _signature(db, model)
+            if signature != self._signatures.get(model) or model in self._unsettled:
+                self.reload(db, model, signature)
+
+    def reindex(self, db: Session, model, ids):
+        # For bulk statements that bypass the ORM flush hooks
+        source = SOURCES.get(model)
+        if source is None:
+            return
+        ids = list(ids)
+        found = set()
+        for row in db.query(model).filter(model.id.in_(ids)).all():
+            key, payload = document_from_row(row)
+            self.apply(key, payload)
+            found.add(row.id)
+        for missing in set(ids) - found:
+            self.remove((source.type, missing))
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._docs),
+            "terms": len(self._postings),
+            "rebuilds": self.rebuilds,
+            "reloads": self.reloads,
+        }
+
+
+def _signature(db: Session, model) -> tuple:
+    return tuple(db.execute(select(func.count(), func.max(model.id), func.max(model.updated_at))).one())
+
+
+search_index = SearchIndex()
+
+
+def build_index():
+    db = SessionLocal()
+    try:
+        search_index.rebuild(db)
+    finally:
+        db.close()
+
+
+def refresh_index():
+    db = SessionLocal()
+    try:
+        search_index.rebuild_if_stale(db)
+    finally:
+        db.close()
+
+
+# Keep the index in step with committed admin writes. Payloads are captured at
+# flush time (attributes are expired after commit) and applied on commit.
+@event.listens_for(Session, "after_flush")
+def _collect_search_changes(session, flush_context):
+    changes = {}
+    for instance in session.new | session.dirty:
+        if type(instance) in SOURCES:
+            key, payload = document_from_row(instance)
+            changes[key] = payload
+    for instance in session.deleted:
+        if type(instance) in SOURCES:
+            changes[(SOURCES[type(instance)].type, instance.id)] = None
+    if changes:
+        session.info.setdefault("search_pending", {}).update(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_search_changes(session):
+    pending = session.info.pop("search_pending", None)
+    if pending:
+        for key, payload in pending.items():
+            search_index.apply(key, payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_search_changes(session):
+    session.info.pop("search_pending", None)
@@ -1,13 +1,14 @@
-from fastapi import Request, HTTPException
+from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime, timedelta
-import jwt
+from jose import jwt
 from typing import Optional
 import os
 from dotenv import load_dotenv
-import re
-from user_agents import parse
 import ipaddress
+from .user_agent import parse_user_agent
+from .ratelimit import client_ip, rate_limiter
+from .screening import engine as screening_engine
 
 load_dotenv()
 
@@ -18,16 +19,15 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
 class SecurityMiddleware:
     def __init__(self):
         self.security = HTTPBearer()
-        self.blocked_ips = set()
-        self.failed_attempts = {}
+        # Failure counts and blocks live in the shared rate limiter store so
+        # they apply across workers and expire on their own
+        self.limiter = rate_limiter
         self.max_attempts = 5
+        self.attempt_window = timedelta(minutes=15)
         self.block_duration = timedelta(minutes=15)
-        self.suspicious_patterns = [
-            r"\.\./",  # Directory traversal
-            r"<script>",  # XSS
-            r"UNION\s+SELECT",  # SQL Injection
-            r"exec\s*\(",  # Command injection
-        ]
+        # Directory traversal, XSS, SQL and command injection... rules are
+        # precompiled once and can be reloaded from SCREENING_RULES_FILE
+        self.screening = screening_engine
 
     async def verify_token(self, request: Request) -> Optional[str]:
         try:
@@ -39,18 +39,14 @@ class SecurityMiddleware:
             return None
 
     def check_ip(self, ip: str) -> bool:
-        if ip in self.blocked_ips:
-            return False
-        return True
+        return not self.is_ip_blocked(ip)
 
     def check_suspicious_activity(self, request: Request) -> bool:
-        # Check for suspicious patterns in URL and headers
-        path = request.url.path
+        # Check for suspicious patterns in the path, query string and headers
         headers = request.headers
 
-        for pattern in self.suspicious_patterns:
-            if re.search(pattern, path, re.IGNORECASE):
-                return False
+        if self.screening.scan(request) is not None:
+            return False
 
         # Check for suspicious user agents
         user_agent = headers.get("user-agent", "")
@@ -59,35 +55,26 @@ class SecurityMiddleware:
 
         return True
 
-    def track_failed_attempt(self, ip: str):
-        if ip not in self.failed_attempts:
-            self.failed_attempts[ip] = {"count": 0, "timestamp": datetime.now()}
-        
-        self.failed_attempts[ip]["count"] += 1
-        
-        if self.failed_attempts[ip]["count"] >= self.max_attempts:
-            self.blocked_ips.add(ip)
-            self.failed_attempts[ip]["timestamp"] = datetime.now()
+    def track_failed_attempt(self, ip: str) -> bool:
+        return self.limiter.record_failure(
+            f"ip:{ip}",
+            self.max_attempts,
+            self.attempt_window.total_seconds(),
+            self.block_duration.total_seconds()
+        )
 
     def is_ip_blocked(self, ip: str) -> bool:
-        if ip in self.blocked_ips:
-            block_time = self.failed_attempts[ip]["timestamp"]
-            if datetime.now() - block_time > self.block_duration:
-                self.blocked_ips.remove(ip)
-                del self.failed_attempts[ip]
-                return False
-            return True
-        return False
+        return self.limiter.blocked_for(f"ip:{ip}") > 0
 
     def get_client_info(self, request: Request) -> dict:
-        user_agent = parse(request.headers.get("user-agent", ""))
-        ip = request.client.host
+        user_agent = parse_user_agent(request.headers.get("user-agent", ""))
+        ip = client_ip(request)
         
         return {
             "ip": ip,
-            "browser": user_agent.browser.family,
-            "os": user_agent.os.family,
-            "device": user_agent.device.family,
+            "browser": user_agent.browser,
+            "os": user_agent.os,
+            "device": user_agent.device,
             "is_mobile": user_agent.is_mobile,
             "is_tablet": user_agent.is_tablet,
             "is_pc": user_agent.is_pc,
@@ -101,4 +88,10 @@ class SecurityMiddleware:
         except ValueError:
             return False
 
-security_middleware = SecurityMiddleware() 
\ No newline at end of file
+security_middleware = SecurityMiddleware()
+
+
+async def require_unblocked_ip(request: Request):
+    # Route dependency for the auth endpoints, where failed logins block an IP
+    if await rate_limiter.run(security_middleware.is_ip_blocked, client_ip(request)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access temporarily blocked")
\ No newline at end of file
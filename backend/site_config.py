@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from fastapi import Request, Response
+from sqlalchemy import or_
+
+from . import models, schemas
+from .database import SessionLocal
+from .public_cache import PUBLIC_CACHE_MAX_AGE, PUBLIC_CACHE_TTL_SECONDS, versions, not_modified
+
+# Browsers and CDNs revalidate every time (a 304 while the ETag matches), so
+# they never serve a document older than the one this worker holds
+SITE_CONFIG_MAX_AGE = int(os.getenv("SITE_CONFIG_MAX_AGE", str(PUBLIC_CACHE_MAX_AGE)))
+# Versions are per process, so this bounds how long another worker's write
+# can go unnoticed
+SITE_CONFIG_TTL_SECONDS = int(os.getenv("SITE_CONFIG_TTL_SECONDS", str(PUBLIC_CACHE_TTL_SECONDS)))
+
+SITE_CONFIG_TABLES = (
+    models.ThemeSettings.__tablename__,
+    models.SocialMedia.__tablename__,
+    models.Notification.__tablename__,
+)
+
+Document = namedtuple("Document", ["etag", "body", "gzipped"])
+
+
+class SiteConfigDocument:
+    # The theme, active social links and live notifications, serialized once
+    # and served as-is (plain and gzip) until one of the source tables changes.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._expires_at = 0.0
+        self._document = None
+        self.builds = 0
+
+    def _is_current(self, version) -> bool:
+        return self._document is not None and self._version == version and time.monotonic() < self._expires_at
+
+    def _build(self, version):
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            theme = db.query(models.ThemeSettings).first()
+            social_media = db.query(models.SocialMedia).filter(
+                models.SocialMedia.is_active == True
+            ).order_by(models.SocialMedia.id).all()
+            notifications = db.query(models.Notification).filter(or_(
+                models.Notification.expiry_date == None,
+                models.Notification.expiry_date > now
+            )).order_by(models.Notification.id.desc()).all()
+
+            document = schemas.SiteConfig(
+                theme=theme,
+                social_media=social_media,
+                notifications=notifications,
+            )
+        finally:
+            db.close()
+
+        # Rebuild when the next notification expires, even without a write
+        ttl = SITE_CONFIG_TTL_SECONDS
+        for notification in notifications:
+            if notification.expiry_date is not None:
+                expiry = notification.expiry_date.replace(tzinfo=None)
+                ttl = min(ttl, max(1, (expiry - now).total_seconds()))
+
+        body = document.model_dump_json().encode()
+        self._document = Document(
+            etag=f'"{hashlib.sha1(body).hexdigest()}"',
+            body=body,
+            gzipped=gzip.compress(body, compresslevel=9),
+        )
+        self._version = version
+        self._expires_at = time.monotonic() + ttl
+        self.builds += 1
+
+    def get(self) -> Document:
+        version = tuple(versions.get(table) for table in SITE_CONFIG_TABLES)
+        if not self._is_current(version):
+            with self._lock:
+                if not self._is_current(version):
+                    self._build(version)
+        return self._document
+
+    def stats(self) -> dict:
+        document = self._document
+        return {
+            "builds": self.builds,
+            "size": len(document.body) if document else 0,
+            "gzipped_size": len(document.gzipped) if document else 0,
+        }
+
+
+site_config = SiteConfigDocument()
+
+
+def site_config_response(request: Request) -> Response:
+    document = site_config.get()
+    headers = {
+        "ETag": document.etag,
+        "Cache-Control": f"public, max-age={SITE_CONFIG_MAX_AGE}, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+    if not_modified(request, document.etag):
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=document.gzipped, media_type="application/json", headers=headers)
+    return Response(content=document.body, media_type="application/json", headers=headers)
@@ -0,0 +1,31 @@
+import asyncio
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+_tasks = []
+
+
+async def _run_every(name: str, interval: float, func):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(func)
+        except Exception as e:
+            logger.error(f"Error running periodic task {name}: {str(e)}")
+
+
+def schedule(name: str, interval: float, func):
+    # Run a blocking job in the threadpool every `interval` seconds
+    task = asyncio.create_task(_run_every(name, interval, func), name=name)
+    _tasks.append(task)
+    return task
+
+
+async def cancel_all():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
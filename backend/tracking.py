@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+from collections import namedtuple
+
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from starlette.concurrency import run_in_threadpool
+from . import models
+from .geoip import resolver as geoip_resolver
+from .user_agent import parse_user_agent
+from .unique_visitors import counter as unique_visitor_counter, visitor_key
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+TRACKING_QUEUE_SIZE = int(os.getenv("TRACKING_QUEUE_SIZE", "10000"))
+TRACKING_BATCH_SIZE = int(os.getenv("TRACKING_BATCH_SIZE", "500"))
+TRACKING_FLUSH_INTERVAL = float(os.getenv("TRACKING_FLUSH_INTERVAL", "2.0"))
+TRACKING_DRAIN_TIMEOUT = float(os.getenv("TRACKING_DRAIN_TIMEOUT", "10.0"))
+
+# Compact record of a tracked hit; everything expensive (user agent parsing,
+# GeoIP lookups, DB writes) happens later on the flush worker.
+PageViewEvent = namedtuple(
+    "PageViewEvent",
+    ["page_path", "ip_address", "user_agent", "referrer", "session_id", "created_at", "visitor_id"],
+)
+
+_STOP = object()
+
+
+class PageViewQueue:
+    def __init__(self, maxsize: int, batch_size: int, flush_interval: float):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = None
+        self._worker = None
+        self._closing = False
+
+        # Counters
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._closing = False
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._closing = True
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._worker, timeout=TRACKING_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"Page view queue did not drain within {TRACKING_DRAIN_TIMEOUT}s")
+        self._worker = None
+
+    def enqueue(self, event: PageViewEvent) -> bool:
+        # Never block the request: when the worker falls behind, shed load
+        if self._queue is None or self._closing:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "capacity": self.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+
+    async def _next_batch(self):
+        # Block for the first event, then fill the batch until it is full or
+        # the flush interval has elapsed.
+        loop = asyncio.get_running_loop()
+        item = await self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _flush(self, batch):
+        try:
+            await run_in_threadpool(write_batch, batch)
+            self.flushed += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Error flushing {len(batch)} page views: {str(e)}")
+        self.batches += 1
+
+
+def write_batch(batch):
+    page_views = []
+    sessions = {}
+    visits = []
+
+    for event in batch:
+        user_agent = parse_user_agent(event.user_agent)
+        visits.append((
+            event.created_at.date(),
+            event.page_path,
+            visitor_key(event.visitor_id, event.session_id, event.ip_address, event.user_agent),
+        ))
+
+        page_views.append({
+            "page_path": event.page_path,
+            "ip_address": event.ip_address,
+            "user_agent": user_agent.summary,
+            "referrer": event.referrer,
+            "created_at": event.created_at,
+        })
+
+        # Collapse repeated hits from the same visitor into one upsert row
+        session = sessions.get(event.session_id)
+        if session:
+            session["visit_count"] += 1
+            session["last_visit"] = event.created_at
+            continue
+        country, city = geoip_resolver.lookup(event.ip_address)
+        sessions[event.session_id] = {
+            "session_id": event.session_id,
+            "ip_address": event.ip_address,
+            "user_agent": user_agent.summary,
+            "country": country,
+            "city": city,
+            "device_type": user_agent.device,
+            "browser": user_agent.browser,
+            "os": user_agent.os,
+            "visit_count": 1,
+            "first_visit": event.created_at,
+            "last_visit": event.created_at,
+        }
+
+    # Unique visitor sketches are kept in memory and persisted on their own schedule
+    unique_visitor_counter.add_batch(visits)
+
+    db = SessionLocal()
+    try:
+        db.execute(mysql_insert(models.PageView).values(page_views))
+
+        upsert = mysql_insert(models.VisitorSession).values(list(sessions.values()))
+        upsert = upsert.on_duplicate_key_update(
+            visit_count=models.VisitorSession.visit_count + upsert.inserted.visit_count,
+            last_visit=upsert.inserted.last_visit,
+        )
+        db.execute(upsert)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+page_view_queue = PageViewQueue(
+    maxsize=TRACKING_QUEUE_SIZE,
+    batch_size=TRACKING_BATCH_SIZE,
+    flush_interval=TRACKING_FLUSH_INTERVAL,
+)
@@ -0,0 +1,212 @@
+import argparse
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import tuple_, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import LRUCache
+from .database import SessionLocal, engine
+from .hll import DEFAULT_PRECISION, HyperLogLog, hash_value
+
+logger = logging.getLogger(__name__)
+
+UNIQUE_VISITOR_PRECISION = int(os.getenv("UNIQUE_VISITOR_PRECISION", str(DEFAULT_PRECISION)))
+UNIQUE_VISITOR_FLUSH_INTERVAL = float(os.getenv("UNIQUE_VISITOR_FLUSH_INTERVAL", "60"))
+# Per-page sketches kept per day; hits on further paths still count site-wide
+UNIQUE_VISITOR_MAX_PAGES = int(os.getenv("UNIQUE_VISITOR_MAX_PAGES", "500"))
+UNIQUE_VISITOR_CHUNK_SIZE = int(os.getenv("UNIQUE_VISITOR_CHUNK_SIZE", "500"))
+# How long a cookieless client (IP + user agent) keeps the first session id
+# issued to it; clients that never send the cookie back count once per window
+UNIQUE_VISITOR_ANONYMOUS_TTL = float(os.getenv("UNIQUE_VISITOR_ANONYMOUS_TTL", "1800"))
+UNIQUE_VISITOR_ANONYMOUS_MAX = int(os.getenv("UNIQUE_VISITOR_ANONYMOUS_MAX", "50000"))
+
+SITE = ""
+# The lifetime sketch is stored as a row on this day so "all time" is one
+# row read rather than a merge of every daily sketch
+ALL_TIME = date(1970, 1, 1)
+
+
+_anonymous = LRUCache(UNIQUE_VISITOR_ANONYMOUS_MAX, ttl=UNIQUE_VISITOR_ANONYMOUS_TTL)
+
+
+def visitor_key(cookie: str, session_id: str, ip_address: str, user_agent: str) -> str:
+    # The session id is the visitor: the returned cookie, or on a first hit
+    # the id just issued in the cookie, so the first hit and the ones after it
+    # share a key. Hits without a cookie reuse the first id issued to the same
+    # IP + user agent, so clients that drop cookies aren't a new visitor every hit.
+    if cookie:
+        return cookie
+    client = f"{ip_address}|{user_agent}"
+    issued = _anonymous.get(client) or session_id or client
+    _anonymous.set(client, issued)
+    return issued
+
+
+class UniqueVisitorCounter:
+    # Sketches are filled in memory by the tracking worker and merged into
+    # unique_visitor_sketches periodically. Merging is a register-wise max,
+    # so re-merging the same visits (a retried flush, another worker's
+    # sketch) never inflates the counts.
+
+    def __init__(self, precision: int = UNIQUE_VISITOR_PRECISION, max_pages: int = UNIQUE_VISITOR_MAX_PAGES):
+        self.precision = precision
+        self.max_pages = max_pages
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}  # (day, page_path) -> HyperLogLog
+        self._pages = {}  # day -> paths given a per-page sketch that day
+        self.recorded = 0
+        self.flushed = 0
+        self.failed = 0
+
+    def _sketch(self, key) -> HyperLogLog:
+        sketch = self._pending.get(key)
+        if sketch is None:
+            sketch = self._pending[key] = HyperLogLog(self.precision)
+        return sketch
+
+    def add_batch(self, visits):
+        # visits: (day, page_path, visitor key) tuples
+        with self._lock:
+            for day, page_path, visitor in visits:
+                value_hash = hash_value(visitor)
+                self._sketch((ALL_TIME, SITE)).add_hash(value_hash)
+                self._sketch((day, SITE)).add_hash(value_hash)
+                pages = self._pages.setdefault(day, set())
+                if page_path not in pages:
+                    if len(pages) >= self.max_pages:
+                        continue
+                    pages.add(page_path)
+                self._sketch((day, page_path or SITE)).add_hash(value_hash)
+            self.recorded += len(visits)
+
+    def _write(self, db: Session, sketches: dict):
+        keys = sorted(sketches)
+        for start in range(0, len(keys), UNIQUE_VISITOR_CHUNK_SIZE):
+            chunk = keys[start:start + UNIQUE_VISITOR_CHUNK_SIZE]
+            # Make sure every row exists, then lock them in id order so
+            # concurrent flushes from several workers can't deadlock
+            db.execute(mysql_insert(models.UniqueVisitorSketch).values([
+                {"day": day, "page_path": page_path, "registers": b""}
+                for day, page_path in chunk
+            ]).prefix_with("IGNORE"))
+            rows = db.query(models.UniqueVisitorSketch).filter(
+                tuple_(models.UniqueVisitorSketch.day, models.UniqueVisitorSketch.page_path).in_(chunk)
+            ).order_by(models.UniqueVisitorSketch.id).with_for_update().all()
+
+            changes = []
+            for row in rows:
+                stored = HyperLogLog.from_bytes(row.registers, self.precision)
+                stored.merge(sketches[(row.day, row.page_path)])
+                changes.append({"id": row.id, "registers": stored.to_bytes()})
+            db.execute(update(models.UniqueVisitorSketch), changes)
+        db.commit()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                sketches, self._pending = self._pending, {}
+                # Page caps only matter for days still being recorded
+                yesterday = datetime.utcnow().date() - timedelta(days=1)
+                self._pages = {day: pages for day, pages in self._pages.items() if day >= yesterday}
+            if not sketches:
+                return
+
+            db = SessionLocal()
+            try:
+                self._write(db, sketches)
+                self.flushed += len(sketches)
+            except Exception as e:
+                db.rollback()
+                self.failed += 1
+                logger.error(f"Error flushing {len(sketches)} unique visitor sketches: {str(e)}")
+                # Merged back for the next flush
+                with self._lock:
+                    for key, sketch in sketches.items():
+                        self._sketch(key).merge(sketch)
+            finally:
+                db.close()
+
+    def estimate(self, db: Session, start: date, end: date, page_path: str = SITE) -> int:
+        # Distinct visitors over start..end inclusive, as the union of the
+        # daily sketches plus this process's unflushed ones
+        total = HyperLogLog(self.precision)
+        rows = db.query(models.UniqueVisitorSketch.registers).filter(
+            models.UniqueVisitorSketch.day >= start,
+            models.UniqueVisitorSketch.day <= end,
+            models.UniqueVisitorSketch.page_path == page_path
+        ).all()
+        for (registers,) in rows:
+            total.merge(HyperLogLog.from_bytes(registers, self.precision))
+        with self._lock:
+            for (day, path), sketch in self._pending.items():
+                if path == page_path and start <= day <= end:
+                    total.merge(sketch)
+        return total.count()
+
+    def lifetime(self, db: Session) -> int:
+        return self.estimate(db, ALL_TIME, ALL_TIME)
+
+    def summary(self, db: Session, page_path: str = SITE, today: date = None) -> dict:
+        today = today or datetime.utcnow().date()
+        return {
+            "daily": self.estimate(db, today, today, page_path),
+            "weekly": self.estimate(db, today - timedelta(days=6), today, page_path),
+            "monthly": self.estimate(db, today - timedelta(days=29), today, page_path),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending_sketches": pending,
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "failed": self.failed,
+        }
+
+
+counter = UniqueVisitorCounter()
+
+
+def backfill(chunk_size: int = UNIQUE_VISITOR_CHUNK_SIZE * 100):
+    # Seeds the sketches from the visitor sessions still in the database, so
+    # lifetime and daily counts include visitors from before the sketches
+    # existed. Merging is idempotent, so running it twice changes nothing.
+    sessions = models.VisitorSession.__table__
+    query = sessions.select().with_only_columns(
+        sessions.c.session_id, sessions.c.first_visit, sessions.c.last_visit
+    )
+    seeded = 0
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        for rows in result.partitions():
+            visits = []
+            for session_id, first_visit, last_visit in rows:
+                for seen in {first_visit, last_visit}:
+                    if seen is not None:
+                        visits.append((seen.date(), SITE, session_id))
+            counter.add_batch(visits)
+            seeded += len(rows)
+    # Sketches are a few KiB per day however many sessions went in, so they
+    # are written once the read has finished
+    counter.flush()
+    return seeded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain unique visitor sketches")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--chunk-size", type=int, default=UNIQUE_VISITOR_CHUNK_SIZE * 100)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    models.Base.metadata.create_all(bind=engine)
+    print("Seeding unique visitor sketches from visitor sessions...")
+    seeded = backfill(chunk_size=args.chunk_size)
+    print(f"Seeded {seeded} visitor sessions!")
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import re
+import uuid
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+# Room for the multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+_EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+def _extension(filename: str) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if _EXTENSION_RE.match(extension) else ""
+
+
+def declared_too_large(headers) -> bool:
+    try:
+        length = int(headers.get("content-length", ""))
+    except ValueError:
+        return False
+    return length > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the {MAX_UPLOAD_BYTES} byte upload limit"
+    )
+
+
+class UploadSizeLimit:
+    # ASGI middleware for the upload endpoint. Starlette spools the whole
+    # multipart body to a temp file before the endpoint runs, so the check in
+    # store_upload only bounds what is kept. This one bounds what is read: a
+    # declared Content-Length over the limit is refused before any body
+    # arrives, and a chunked body fails with 413 once the bytes received pass it.
+
+    def __init__(self, app, path: str, limit: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.path = path
+        self.limit = limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        if declared_too_large(headers):
+            error = _too_large()
+            response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    # Raised inside request.form(); FastAPI passes HTTPExceptions through
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _discard(path: str):
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def store_upload(file: UploadFile, upload_dir: str) -> dict:
+    # Stream the upload to a temp file in fixed-size chunks, hashing as we go,
+    # then move it to its content address. Identical files share one copy.
+    digest = hashlib.sha256()
+    size = 0
+    temp_path = os.path.join(upload_dir, f".{uuid.uuid4().hex}.part")
+
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise _too_large()
+                digest.update(chunk)
+                await buffer.write(chunk)
+    except BaseException:
+        await _discard(temp_path)
+        raise
+
+    sha256 = digest.hexdigest()
+    filename = f"{sha256}{_extension(file.filename)}"
+    file_path = os.path.join(upload_dir, filename)
+
+    deduplicated = await aiofiles.os.path.exists(file_path)
+    if deduplicated:
+        await _discard(temp_path)
+    else:
+        await aiofiles.os.replace(temp_path, file_path)
+
+    return {
+        "url": f"/uploads/{filename}",
+        "path": file_path,
+        "sha256": sha256,
+        "size": size,
+        "deduplicated": deduplicated,
+    }
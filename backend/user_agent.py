@@ -0,0 +1,45 @@
+import os
+from collections import namedtuple
+
+from user_agents import parse
+
+from .cache import LRUCache
+
+USER_AGENT_CACHE_SIZE = int(os.getenv("USER_AGENT_CACHE_SIZE", "10000"))
+# Longer strings are parsed but not cached, so junk headers can't bloat memory
+USER_AGENT_MAX_CACHED_LENGTH = 512
+
+UserAgentInfo = namedtuple(
+    "UserAgentInfo",
+    ["summary", "browser", "os", "device", "is_mobile", "is_tablet", "is_pc"],
+)
+
+_cache = LRUCache(USER_AGENT_CACHE_SIZE)
+
+
+def _extract(ua_string: str) -> UserAgentInfo:
+    user_agent = parse(ua_string)
+    return UserAgentInfo(
+        summary=str(user_agent),
+        browser=user_agent.browser.family,
+        os=user_agent.os.family,
+        device=user_agent.device.family,
+        is_mobile=user_agent.is_mobile,
+        is_tablet=user_agent.is_tablet,
+        is_pc=user_agent.is_pc,
+    )
+
+
+def parse_user_agent(ua_string: str) -> UserAgentInfo:
+    ua_string = ua_string or ""
+    if len(ua_string) > USER_AGENT_MAX_CACHED_LENGTH:
+        return _extract(ua_string)
+    info = _cache.get(ua_string)
+    if info is None:
+        info = _extract(ua_string)
+        _cache.set(ua_string, info)
+    return info
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
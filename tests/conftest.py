@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Must be set before backend.database creates the async engine. A file, not
+# :memory:, so every pooled connection sees the same database.
+ASYNC_DB_PATH = os.path.join(tempfile.mkdtemp(), "async.db")
+os.environ.setdefault("ASYNC_DATABASE_URL", f"sqlite+aiosqlite:///{ASYNC_DB_PATH}")
+
+from backend import models  # noqa: E402
+
+
+def _register_mysql_functions(dbapi_connection, connection_record):
+    # MySQL functions used by the analytics queries
+    dbapi_connection.create_function("date_format", 2, lambda value, fmt: value)
+
+
+@pytest.fixture
+def sqlite_engine():
+    engine = create_engine("sqlite://")
+    event.listen(engine, "connect", _register_mysql_functions)
+    models.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def async_db():
+    # Tables for backend.database.async_engine, created through a sync engine
+    # on the same file and dropped afterwards
+    engine = create_engine(f"sqlite:///{ASYNC_DB_PATH}")
+    models.Base.metadata.create_all(bind=engine)
+    yield engine
+    models.Base.metadata.drop_all(bind=engine)
+    engine.dispose()
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend import auth, database, models
+
+
+def _credentials(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def _add_user(engine, email: str, is_admin: bool = False):
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert().values(
+            email=email, hashed_password="x", is_active=True, is_admin=is_admin
+        ))
+
+
+def _run(coroutine):
+    # Pooled aiosqlite connections belong to the loop that opened them, and
+    # every asyncio.run() starts a new loop
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await database.async_engine.dispose()
+    return asyncio.run(run())
+
+
+async def _current_user(token: str):
+    # Drives the dependency chain the way FastAPI does
+    dependency = database.get_async_db()
+    db = await dependency.__anext__()
+    try:
+        return await auth.get_current_user(_credentials(token), db)
+    finally:
+        await dependency.aclose()
+
+
+@pytest.fixture(autouse=True)
+def _clear_principals():
+    auth._principal_cache.clear()
+    auth._principal_tokens.clear()
+    yield
+    auth._principal_cache.clear()
+    auth._principal_tokens.clear()
+
+
+def test_get_async_db_yields_a_working_session(async_db):
+    _add_user(async_db, "reader@example.com")
+
+    async def run():
+        dependency = database.get_async_db()
+        db = await dependency.__anext__()
+        assert isinstance(db, AsyncSession)
+        result = await db.execute(select(models.User.email))
+        emails = result.scalars().all()
+        await dependency.aclose()
+        return emails
+
+    assert _run(run()) == ["reader@example.com"]
+
+
+def test_get_current_user_loads_and_caches_the_principal(async_db):
+    _add_user(async_db, "admin@example.com", is_admin=True)
+    token = auth.create_access_token({"sub": "admin@example.com"})
+
+    user = _run(_current_user(token))
+    assert user.email == "admin@example.com"
+    assert user.is_admin
+
+    # The second lookup is served from the principal cache, not the database
+    with async_db.begin() as conn:
+        conn.execute(models.User.__table__.delete())
+    cached = _run(_current_user(token))
+    assert cached.email == "admin@example.com"
+    assert _run(auth.get_current_admin_user(cached)) is cached
+
+
+def test_get_current_user_rejects_unknown_users_and_bad_tokens(async_db):
+    token = auth.create_access_token({"sub": "ghost@example.com"})
+    for bad in (token, "not-a-token", auth.create_access_token({"role": "admin"})):
+        with pytest.raises(HTTPException) as error:
+            _run(_current_user(bad))
+        assert error.value.status_code == 401
+
+
+def test_get_current_admin_user_requires_admin(async_db):
+    _add_user(async_db, "editor@example.com")
+    token = auth.create_access_token({"sub": "editor@example.com"})
+
+    user = _run(_current_user(token))
+    with pytest.raises(HTTPException) as error:
+        _run(auth.get_current_admin_user(user))
+    assert error.value.status_code == 403
+
+
+def test_principal_is_evicted_when_the_change_commits(sqlite_engine):
+    with Session(sqlite_engine) as db:
+        user = models.User(email="staff@example.com", hashed_password="x", is_active=True, is_admin=True)
+        db.add(user)
+        db.commit()
+        token = auth.create_access_token({"sub": "staff@example.com"})
+        auth.cache_principal(token, {"exp": 2 ** 31}, user)
+
+        user.is_admin = False
+        db.flush()
+        # Not yet committed: other requests still see the old row
+        assert auth.get_cached_principal(token).is_admin
+
+        db.commit()
+        assert auth.get_cached_principal(token) is None
+
+        auth.cache_principal(token, {"exp": 2 ** 31}, user)
+        user.is_active = False
+        db.flush()
+        db.rollback()
+        assert auth.get_cached_principal(token) is not None
@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from backend import bulk, models
+from backend.audit import AuditLog
+
+CSV = "\ufefftitle,content,section,slug,is_published\r\nAbout,Hello,about,about,\r\nNews,Latest,news,news,false\r\n"
+
+
+def _request(body: bytes, content_type: str) -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/api/admin/bulk/content",
+        "query_string": b"",
+        "headers": [(b"content-type", content_type.encode())],
+    }, receive)
+
+
+def _rows(body: bytes, content_type: str) -> list:
+    return asyncio.run(bulk.bulk_rows(_request(body, content_type)))
+
+
+def _status(call) -> int:
+    with pytest.raises(HTTPException) as error:
+        call()
+    return error.value.status_code
+
+
+@pytest.fixture
+def db(sqlite_engine):
+    session = Session(sqlite_engine)
+    yield session
+    session.close()
+
+
+def _audit(db) -> AuditLog:
+    return AuditLog(db, models.User(id=1, email="admin@example.com"))
+
+
+def test_json_and_csv_bodies_parse_to_the_same_rows():
+    rows = [{"title": "About", "content": "Hello", "section": "about", "slug": "about"}]
+    assert _rows(json.dumps(rows).encode(), "application/json") == rows
+
+    # The BOM is stripped and empty cells are left out so defaults apply
+    assert _rows(CSV.encode(), "text/csv") == [
+        {"title": "About", "content": "Hello", "section": "about", "slug": "about"},
+        {"title": "News", "content": "Latest", "section": "news", "slug": "news", "is_published": "false"},
+    ]
+
+    boundary = "bulk-test"
+    multipart = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="content.csv"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+        f"{CSV}\r\n--{boundary}--\r\n"
+    ).encode()
+    assert _rows(multipart, f"multipart/form-data; boundary={boundary}") == _rows(CSV.encode(), "text/csv")
+
+
+def test_bad_payloads_are_rejected(monkeypatch):
+    assert _status(lambda: _rows(b"{not json", "application/json")) == 400
+    assert _status(lambda: _rows(b'{"title": "About"}', "application/json")) == 400
+    assert _status(lambda: _rows(b"[]", "application/json")) == 400
+
+    monkeypatch.setattr(bulk, "BULK_MAX_ROWS", 2)
+    assert _status(lambda: _rows(json.dumps([{}] * 3).encode(), "application/json")) == 413
+
+
+def test_create_from_csv_writes_rows_and_an_audit_entry(db):
+    rows = _rows(CSV.encode(), "text/csv")
+
+    assert bulk.bulk_create(db, _audit(db), "content", rows) == {"created": 2}
+    published = dict(db.query(models.Content.slug, models.Content.is_published).all())
+    assert published == {"about": True, "news": False}
+    assert [log.action for log in db.query(models.AdminLog)] == ["bulk_create_content"]
+
+
+def test_invalid_rows_are_reported_together_and_nothing_is_written(db):
+    rows = [{"question": "Fees?", "answer": "See the office"}, {"question": "Hostel?"}, "not a row"]
+
+    with pytest.raises(HTTPException) as error:
+        bulk.bulk_create(db, _audit(db), "faqs", rows)
+    assert error.value.status_code == 422
+    assert [row["row"] for row in error.value.detail] == [1, 2]
+    assert db.query(models.FAQ).count() == 0
+
+
+def test_conflicting_create_keeps_nothing_from_the_batch(db):
+    bulk.bulk_create(db, _audit(db), "content", [
+        {"title": "About", "content": "Hello", "section": "about", "slug": "about"}
+    ])
+    rows = [
+        {"title": "Admissions", "content": "Apply", "section": "admissions", "slug": "admissions"},
+        {"title": "About again", "content": "Hi", "section": "about", "slug": "about"},
+    ]
+
+    assert _status(lambda: bulk.bulk_create(db, _audit(db), "content", rows)) == 409
+    assert [slug for (slug,) in db.query(models.Content.slug)] == ["about"]
+
+
+def test_update_and_delete_need_existing_unique_ids(db):
+    bulk.bulk_create(db, _audit(db), "faqs", [
+        {"question": "Fees?", "answer": "See the office"},
+        {"question": "Hostel?", "answer": "Yes"},
+    ])
+    first, second = [faq.id for faq in db.query(models.FAQ).order_by(models.FAQ.id)]
+
+    missing = [{"id": first, "question": "Fees?", "answer": "Online"}, {"id": 999, "question": "?", "answer": "?"}]
+    assert _status(lambda: bulk.bulk_update(db, _audit(db), "faqs", missing)) == 404
+    assert _status(lambda: bulk.bulk_delete(db, _audit(db), "faqs", [first, first])) == 400
+
+    updated = bulk.bulk_update(db, _audit(db), "faqs", [{"id": first, "question": "Fees?", "answer": "Online"}])
+    assert updated == {"updated": 1}
+    assert bulk.bulk_delete(db, _audit(db), "faqs", [{"id": second}]) == {"deleted": 1}
+    assert [(faq.id, faq.answer) for faq in db.query(models.FAQ)] == [(first, "Online")]
+
+
+def test_unknown_entity_is_not_found(db):
+    assert _status(lambda: bulk.bulk_create(db, _audit(db), "users", [{}])) == 404
@@ -0,0 +1,75 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import crud, models, schemas
+from backend.auth import get_current_admin_user
+from backend.database import get_db
+
+SUBSCRIBER = {"email": "a@example.com", "first_name": "Asha", "last_name": "Rao", "interests": {"news": True}}
+
+
+@pytest.fixture
+def client():
+    # One shared connection: the sync routes run in worker threads
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    def get_test_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(crud.crud_router(models.Subscriber, schemas.Subscriber, schemas.SubscriberCreate, "subscribers", "subscriber"))
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_current_admin_user] = lambda: models.User(id=1, email="admin@example.com", is_admin=True)
+    with TestClient(app) as test_client:
+        test_client.engine = engine
+        yield test_client
+    engine.dispose()
+
+
+def _actions(client) -> list:
+    with client.engine.connect() as conn:
+        return [row.action for row in conn.execute(models.AdminLog.__table__.select().order_by(models.AdminLog.id))]
+
+
+def test_missing_rows_are_404_and_not_logged(client):
+    assert client.get("/api/admin/subscribers/99").status_code == 404
+    response = client.put("/api/admin/subscribers/99", json=SUBSCRIBER)
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Subscriber not found"}
+    assert client.delete("/api/admin/subscribers/99").status_code == 404
+    assert _actions(client) == []
+
+
+def test_unique_conflicts_are_409_and_roll_back(client):
+    first = client.post("/api/admin/subscribers", json=SUBSCRIBER).json()
+    other = client.post("/api/admin/subscribers", json={**SUBSCRIBER, "email": "b@example.com"}).json()
+
+    assert client.post("/api/admin/subscribers", json=SUBSCRIBER).status_code == 409
+    assert client.put(f"/api/admin/subscribers/{other['id']}", json=SUBSCRIBER).status_code == 409
+
+    assert client.get(f"/api/admin/subscribers/{other['id']}").json()["email"] == "b@example.com"
+    assert len(client.get("/api/admin/subscribers").json()["items"]) == 2
+    assert _actions(client) == ["create_subscriber", "create_subscriber"]
+    assert first["id"] != other["id"]
+
+
+def test_update_and_delete_existing_rows(client):
+    created = client.post("/api/admin/subscribers", json=SUBSCRIBER).json()
+
+    response = client.put(f"/api/admin/subscribers/{created['id']}", json={**SUBSCRIBER, "first_name": "Asha R."})
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Asha R."
+
+    assert client.delete(f"/api/admin/subscribers/{created['id']}").json() == {"message": "Subscriber deleted successfully"}
+    assert client.get(f"/api/admin/subscribers/{created['id']}").status_code == 404
+    assert _actions(client) == ["create_subscriber", "update_subscriber", "delete_subscriber"]
@@ -0,0 +1,92 @@
+from datetime import date
+
+import pytest
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend import unique_visitors
+from backend.hll import HyperLogLog
+from backend.unique_visitors import UniqueVisitorCounter
+
+DAY = date(2024, 3, 1)
+
+
+def _sketch(values, precision: int = 12) -> HyperLogLog:
+    sketch = HyperLogLog(precision)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def test_estimates_are_within_the_standard_error():
+    # 1.04 / sqrt(4096) is about 1.6%; allow three standard errors
+    for n in (1000, 20000, 100000):
+        assert abs(_sketch(f"visitor-{i}" for i in range(n)).count() - n) <= 0.05 * n
+    # Small counts use linear counting and are close to exact
+    assert abs(_sketch(f"visitor-{i}" for i in range(50)).count() - 50) <= 1
+
+
+def test_repeats_do_not_inflate_the_count():
+    once = _sketch(f"visitor-{i}" for i in range(5000))
+    many = _sketch(f"visitor-{i % 5000}" for i in range(50000))
+    assert many.registers == once.registers
+
+
+def test_merge_is_the_union_and_idempotent():
+    monday = _sketch(f"visitor-{i}" for i in range(0, 6000))
+    tuesday = _sketch(f"visitor-{i}" for i in range(4000, 10000))
+    both = _sketch(f"visitor-{i}" for i in range(0, 10000))
+
+    monday.merge(tuesday)
+    assert monday.registers == both.registers
+    monday.merge(tuesday)
+    assert monday.registers == both.registers
+
+    with pytest.raises(ValueError):
+        monday.merge(HyperLogLog(10))
+
+
+def test_bytes_round_trip_keeps_precision_and_registers():
+    sketch = _sketch((f"visitor-{i}" for i in range(3000)), precision=10)
+    restored = HyperLogLog.from_bytes(sketch.to_bytes())
+    assert restored.precision == 10
+    assert restored.registers == sketch.registers
+
+    # Freshly inserted rows hold no registers yet
+    assert HyperLogLog.from_bytes(b"", precision=10).is_empty()
+    with pytest.raises(ValueError):
+        HyperLogLog(17)
+    with pytest.raises(ValueError):
+        HyperLogLog(12, bytes(100))
+
+
+@pytest.fixture
+def counter(sqlite_engine, monkeypatch):
+    # INSERT IGNORE is MySQL-only; SQLite spells it INSERT OR IGNORE
+    monkeypatch.setattr(unique_visitors, "mysql_insert", lambda table: sqlite_insert(table).prefix_with("OR"))
+    monkeypatch.setattr(unique_visitors, "SessionLocal", sessionmaker(bind=sqlite_engine))
+    return UniqueVisitorCounter(precision=12, max_pages=2)
+
+
+def test_flushed_sketches_merge_into_stored_ones(counter, sqlite_engine):
+    counter.add_batch([(DAY, "/", f"visitor-{i}") for i in range(300)])
+    counter.flush()
+    # The same visitors again, e.g. from another worker, plus new ones
+    counter.add_batch([(DAY, "/", f"visitor-{i}") for i in range(200, 400)])
+    counter.flush()
+
+    with Session(sqlite_engine) as db:
+        assert abs(counter.estimate(db, DAY, DAY) - 400) <= 8
+        assert abs(counter.estimate(db, DAY, DAY, "/") - 400) <= 8
+        assert abs(counter.lifetime(db) - 400) <= 8
+    assert counter.stats()["pending_sketches"] == 0
+
+
+def test_unflushed_visits_count_and_pages_are_capped(counter, sqlite_engine):
+    counter.add_batch([(DAY, path, f"visitor-{path}") for path in ("/", "/courses", "/events")])
+
+    with Session(sqlite_engine) as db:
+        assert counter.estimate(db, DAY, DAY) == 3
+        assert counter.estimate(db, DAY, DAY, "/courses") == 1
+        # Past max_pages a path only counts site-wide
+        assert counter.estimate(db, DAY, DAY, "/events") == 0
@@ -0,0 +1,18 @@
+from backend import images
+
+
+def test_local_path_only_maps_files_under_uploads(tmp_path):
+    assert images.local_path("/uploads/photo.jpg", str(tmp_path)) == str(tmp_path / "photo.jpg")
+    for url in ["https://example.com/photo.jpg", "/uploads/../main.py", "/uploads/a/b.jpg", None]:
+        assert images.local_path(url, str(tmp_path)) is None
+
+
+def test_existing_variants_lists_only_written_files(tmp_path):
+    variants = {
+        "webp": {"320": "/uploads/photo_w320.webp", "640": "/uploads/photo_w640.webp"},
+        "avif": {"320": "/uploads/photo_w320.avif"},
+    }
+    assert images.existing_variants(variants, str(tmp_path)) is None
+
+    (tmp_path / "photo_w320.webp").write_bytes(b"x")
+    assert images.existing_variants(variants, str(tmp_path)) == {"webp": {"320": "/uploads/photo_w320.webp"}}
@@ -0,0 +1,22 @@
+from backend import index_advisor
+
+
+def test_hot_queries_use_indexes(sqlite_engine):
+    # SQLite's planner only; MySQL plans are checked by running the advisor against it
+    findings = index_advisor.run(bind=sqlite_engine)
+
+    assert {finding.query for finding in findings} == set(index_advisor.HOT_QUERIES)
+    full_scans = [finding for finding in findings if finding.full_scan]
+    assert not full_scans, "\n".join(f"{f.query}: {f.detail}" for f in full_scans)
+
+
+def test_statistics_queries_are_registered():
+    for name in (
+        "page_view_tail",
+        "page_view_rollup_total",
+        "page_view_rollup_by_path",
+        "visitor_tail",
+        "visitor_rollup_dimensions",
+        "visitor_rollup_trend",
+    ):
+        assert name in index_advisor.HOT_QUERIES
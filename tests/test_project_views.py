@@ -0,0 +1,99 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend import models, project_views
+from backend.project_views import ProjectViewCounter
+
+EDITED = datetime(2024, 1, 1, 12, 0, 0)
+
+
+class FailingSession(Session):
+    def execute(self, statement, *args, **kwargs):
+        if statement is project_views._INCREMENT:
+            raise RuntimeError("database went away")
+        return super().execute(statement, *args, **kwargs)
+
+
+@pytest.fixture
+def db(sqlite_engine, monkeypatch):
+    monkeypatch.setattr(project_views, "SessionLocal", sessionmaker(bind=sqlite_engine))
+    session = Session(sqlite_engine)
+    session.add_all([
+        models.Project(id=1, title="Library app", views=5, updated_at=EDITED),
+        models.Project(id=2, title="Timetable", views=None, updated_at=EDITED),
+        models.Project(id=3, title="Results portal", views=5, updated_at=EDITED),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def _stored(db) -> dict:
+    db.expire_all()
+    return {project.id: (project.views, project.updated_at) for project in db.query(models.Project)}
+
+
+def test_flush_adds_pending_views_without_touching_updated_at(db):
+    counter = ProjectViewCounter()
+    counter.reload()
+    counter.record(1)
+    counter.record(2, count=3)
+
+    # Readers see unflushed views straight away
+    assert counter.views(1) == 6
+    assert counter.views(2) == 3
+    assert _stored(db)[1] == (5, EDITED)
+
+    counter.flush()
+    assert _stored(db) == {1: (6, EDITED), 2: (3, EDITED), 3: (5, EDITED)}
+    assert counter.views(1) == 6
+    assert counter.stats()["pending"] == 0
+    assert counter.stats()["flushed"] == 4
+
+    # Nothing pending: no write, just a re-read
+    counter.flush()
+    assert counter.stats()["flushes"] == 1
+
+
+def test_other_workers_counts_show_up_after_a_flush(db):
+    mine, theirs = ProjectViewCounter(), ProjectViewCounter()
+    mine.reload()
+    theirs.reload()
+
+    theirs.record(3, count=2)
+    theirs.flush()
+    assert mine.views(3) == 5
+
+    mine.record(3)
+    mine.flush()
+    assert mine.views(3) == 8
+    assert _stored(db)[3][0] == 8
+
+
+def test_failed_flush_keeps_the_counts_for_the_next_one(db, sqlite_engine, monkeypatch):
+    counter = ProjectViewCounter()
+    counter.reload()
+    counter.record(1, count=2)
+
+    monkeypatch.setattr(project_views, "SessionLocal", sessionmaker(bind=sqlite_engine, class_=FailingSession))
+    counter.flush()
+    assert counter.stats()["failed"] == 1
+    assert counter.views(1) == 7
+    assert _stored(db)[1][0] == 5
+
+    monkeypatch.setattr(project_views, "SessionLocal", sessionmaker(bind=sqlite_engine))
+    counter.flush()
+    assert _stored(db)[1][0] == 7
+    assert counter.views(1) == 7
+
+
+def test_top_ranks_by_total_then_id(db):
+    counter = ProjectViewCounter()
+    counter.reload()
+    counter.record(2, count=5)
+
+    assert [(row["id"], row["views"]) for row in counter.top(limit=2)] == [(1, 5), (2, 5)]
+    counter.record(3)
+    assert [row["title"] for row in counter.top(limit=3)] == ["Results portal", "Library app", "Timetable"]
@@ -0,0 +1,137 @@
+import asyncio
+import ipaddress
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from backend import cache, ratelimit
+
+
+class Clock:
+    # Stands in for the time module: MemoryBackend reads monotonic(),
+    # SQLiteBackend reads time()
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+def _request(client: str, forwarded: str = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": (client, 1234)})
+
+
+def test_client_ip_ignores_forwarded_for_from_untrusted_peers(monkeypatch):
+    monkeypatch.setattr(ratelimit, "TRUSTED_PROXIES", [])
+    assert ratelimit.client_ip(_request("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+    monkeypatch.setattr(ratelimit, "TRUSTED_PROXIES", [ipaddress.ip_network("127.0.0.1")])
+    assert ratelimit.client_ip(_request("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_client_ip_takes_the_nearest_untrusted_forwarded_address(monkeypatch):
+    monkeypatch.setattr(ratelimit, "TRUSTED_PROXIES", [
+        ipaddress.ip_network("127.0.0.1"), ipaddress.ip_network("10.0.0.0/8")
+    ])
+
+    # The left-most entry is whatever the client sent and can't be trusted
+    assert ratelimit.client_ip(_request("127.0.0.1", "1.2.3.4, 198.51.100.1, 10.0.0.5")) == "198.51.100.1"
+    assert ratelimit.client_ip(_request("127.0.0.1")) == "127.0.0.1"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path, clock):
+    if request.param == "memory":
+        return ratelimit.MemoryBackend()
+    return ratelimit.SQLiteBackend(str(tmp_path / "ratelimit.sqlite3"))
+
+
+def test_take_spends_tokens_and_refills_over_time(backend, clock):
+    # 3 tokens, one every 2 seconds
+    assert [backend.take("login:1.2.3.4", 3, 0.5) for _ in range(3)] == [0, 0, 0]
+    assert backend.take("login:1.2.3.4", 3, 0.5) == pytest.approx(2)
+    assert backend.take("login:5.6.7.8", 3, 0.5) == 0
+
+    clock.now += 1
+    assert backend.take("login:1.2.3.4", 3, 0.5) == pytest.approx(1)
+    clock.now += 1
+    assert backend.take("login:1.2.3.4", 3, 0.5) == 0
+
+    # A long idle period refills up to capacity, not beyond it
+    clock.now += 3600
+    assert [backend.take("login:1.2.3.4", 3, 0.5) for _ in range(3)] == [0, 0, 0]
+    assert backend.take("login:1.2.3.4", 3, 0.5) > 0
+
+
+def test_incr_counts_within_a_fixed_window(backend, clock):
+    assert [backend.incr("failures:ip", 60) for _ in range(3)] == [1, 2, 3]
+
+    # Later hits don't extend the window
+    clock.now += 59
+    assert backend.incr("failures:ip", 60) == 4
+    clock.now += 2
+    assert backend.incr("failures:ip", 60) == 1
+
+    backend.reset("failures:ip")
+    assert backend.incr("failures:ip", 60) == 1
+
+
+def test_blocks_expire(backend, clock):
+    backend.block("ip:1.2.3.4", 30)
+    assert backend.blocked_for("ip:1.2.3.4") == pytest.approx(30)
+    assert backend.blocked_for("ip:5.6.7.8") == 0
+
+    clock.now += 20
+    assert backend.blocked_for("ip:1.2.3.4") == pytest.approx(10)
+    clock.now += 11
+    assert backend.blocked_for("ip:1.2.3.4") == 0
+
+    backend.block("ip:1.2.3.4", 30)
+    backend.unblock("ip:1.2.3.4")
+    assert backend.blocked_for("ip:1.2.3.4") == 0
+
+
+def test_record_failure_blocks_at_the_limit_and_starts_over(backend, clock):
+    limiter = ratelimit.RateLimiter(backend)
+
+    assert [limiter.record_failure("ip:1.2.3.4", 3, 60, 300) for _ in range(3)] == [False, False, True]
+    assert limiter.blocked_for("ip:1.2.3.4") == pytest.approx(300)
+
+    # The count restarts after a block, and a success clears it
+    limiter.record_failure("ip:1.2.3.4", 3, 60, 300)
+    limiter.clear_failures("ip:1.2.3.4")
+    assert not limiter.record_failure("ip:1.2.3.4", 3, 60, 300)
+    assert limiter.stats()["decisions"] == {"blocks": 1, "blocked": 1}
+
+
+def test_rate_limit_dependency_answers_429_with_retry_after(clock, monkeypatch):
+    monkeypatch.setattr(ratelimit, "TRUSTED_PROXIES", [])
+    monkeypatch.setattr(ratelimit, "rate_limiter", ratelimit.RateLimiter(ratelimit.MemoryBackend()))
+    dependency = ratelimit.rate_limit("login", "2/minute")
+
+    dependency(_request("203.0.113.7"))
+    dependency(_request("203.0.113.7"))
+    with pytest.raises(HTTPException) as error:
+        dependency(_request("203.0.113.7"))
+    assert error.value.status_code == 429
+    assert error.value.headers == {"Retry-After": "30"}
+    dependency(_request("198.51.100.1"))
+
+
+def test_blocking_backends_run_off_the_event_loop(tmp_path, clock):
+    limiter = ratelimit.RateLimiter(ratelimit.SQLiteBackend(str(tmp_path / "ratelimit.sqlite3")))
+    limiter.block("ip:1.2.3.4", 60)
+    assert asyncio.run(limiter.run(limiter.blocked_for, "ip:1.2.3.4")) == pytest.approx(60)
@@ -0,0 +1,35 @@
+import csv
+import gzip
+from datetime import date
+
+import pytest
+from sqlalchemy import MetaData, inspect, select
+
+from backend import models, retention
+
+
+@pytest.mark.parametrize("name", ["page_views", "users", "visitor_sessions", "scratch", "x; drop table users_rehydrated"])
+def test_rehydrate_refuses_live_and_unsuffixed_tables(sqlite_engine, monkeypatch, tmp_path, name):
+    monkeypatch.setattr(retention, "engine", sqlite_engine)
+
+    with pytest.raises(ValueError):
+        retention.rehydrate(date(2024, 1, 1), date(2024, 2, 1), table_name=name, archive_dir=str(tmp_path))
+    assert inspect(sqlite_engine).has_table("users")
+    assert inspect(sqlite_engine).has_table("page_views")
+
+
+def test_rehydrate_loads_the_range_into_a_scratch_table(sqlite_engine, monkeypatch, tmp_path):
+    monkeypatch.setattr(retention, "engine", sqlite_engine)
+    path = tmp_path / "page_views_2024-01-01_2024-02-01.csv.gz"
+    with gzip.open(path, "wt", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=retention.ARCHIVE_COLUMNS)
+        writer.writeheader()
+        for row_id, day in [(1, "2024-01-05"), (2, "2024-01-20"), (3, "2024-01-31")]:
+            writer.writerow({"id": row_id, "page_path": "/", "created_at": f"{day}T10:00:00"})
+
+    loaded = retention.rehydrate(date(2024, 1, 10), date(2024, 2, 1), archive_dir=str(tmp_path))
+
+    assert loaded == 2
+    table = models.PageView.__table__.to_metadata(MetaData(), name="page_views_rehydrated")
+    with sqlite_engine.connect() as conn:
+        assert sorted(conn.execute(select(table.c.id)).scalars()) == [2, 3]
@@ -0,0 +1,72 @@
+from starlette.requests import Request
+
+import re
+from urllib.parse import quote_plus
+
+from backend.screening import DEFAULT_RULES, Rule, RuleSet, ScreeningEngine
+
+SEARCHES = ["operating system (os)", "python exec()", "sleep(8 hours)", "onerror = retry", "select sleep study"]
+
+
+def _request(path: str, query: str = "", headers: dict = None, method: str = "GET") -> Request:
+    return Request({
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(name.encode(), value.encode()) for name, value in (headers or {}).items()],
+    })
+
+
+def test_rules_match_within_a_field():
+    engine = ScreeningEngine(headers=["user-agent"])
+
+    assert engine.scan(_request("/api/content", "q=1 UNION SELECT password")).name == "sql_injection"
+    assert engine.scan(_request("/", headers={"user-agent": "${jndi:ldap://x}"})).name == "log4shell"
+    assert engine.scan(_request("/api/content", "section=about")) is None
+
+
+def test_no_rule_matches_across_fields():
+    # ".*" and "\s*" would span a joined string; each field is scanned alone
+    rules = DEFAULT_RULES + [Rule("spanning", r"content.*evil"), Rule("spanning", r"union\s*select")]
+    engine = ScreeningEngine(headers=["user-agent", "referer"])
+    engine.load(rules)
+
+    assert engine.scan(_request("/api/content", "q=evil")) is None
+    assert engine.scan(_request("/api/union", headers={"user-agent": "select"})) is None
+    assert engine.scan(_request("/", headers={"user-agent": "content", "referer": "evil"})) is None
+    assert engine.scan(_request("/api/content/evil")).name == "spanning"
+    assert engine.stats()["scanned"] == 4
+
+
+def test_default_rules_pass_ordinary_searches():
+    engine = ScreeningEngine(headers=[])
+    for search in SEARCHES:
+        assert engine.scan(_request("/api/search", f"q={quote_plus(search)}")) is None, search
+
+
+def test_default_rules_still_catch_attacks():
+    rule_set = RuleSet(DEFAULT_RULES)
+    for text, name in [
+        ("1 AND SLEEP(5)", "sql_injection"),
+        ("exec('ls')", "command_injection"),
+        ("system($cmd)", "command_injection"),
+        ('<img src=x onerror="alert(1)">', "xss"),
+    ]:
+        assert rule_set.match(text).name == name, text
+        # The keyword-indexed matcher agrees with a plain re.search per rule
+        assert any(re.search(rule.pattern, text, re.IGNORECASE) for rule in DEFAULT_RULES)
+    for search in SEARCHES:
+        assert not any(re.search(rule.pattern, search, re.IGNORECASE) for rule in DEFAULT_RULES)
+
+
+def test_query_string_matches_only_block_outside_public_reads():
+    engine = ScreeningEngine(headers=[])
+    query = f"q={quote_plus('1 UNION SELECT password')}"
+
+    assert engine.screen(_request("/api/search", query)) is None
+    assert engine.stats()["logged"] == 1
+    assert engine.screen(_request("/api/admin/content", query)).name == "sql_injection"
+    assert engine.screen(_request("/api/contact", query, method="POST")).name == "sql_injection"
+    # The path itself is always screened
+    assert engine.screen(_request("/api/../etc/passwd")).name == "directory_traversal"
@@ -0,0 +1,131 @@
+import math
+
+import pytest
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.search import BM25_B, BM25_K1, SearchIndex
+
+
+def _index(*documents) -> SearchIndex:
+    index = SearchIndex()
+    for key, title, body in documents:
+        index.add(key, title, body)
+    return index
+
+
+def _ids(hits) -> list:
+    return [hit["id"] for hit in hits]
+
+
+def test_score_is_bm25_over_title_weighted_frequencies():
+    index = _index(
+        (("faq", 1), "Library", "Books and journals"),
+        (("faq", 2), "Canteen", "Meals served daily in the canteen"),
+    )
+
+    # "library" appears once in doc 1's title (weight 2); lengths are 4 and 6
+    tf, length, average_length = 2, 4, 5
+    idf = math.log(1 + (2 - 1 + 0.5) / (1 + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+    [hit] = index.search("library")
+    assert hit["score"] == pytest.approx(round(idf * tf * (BM25_K1 + 1) / (tf + norm), 4))
+
+
+def test_title_matches_outrank_body_matches():
+    index = _index(
+        (("faq", 1), "Campus tour", "Ask about hostel rooms"),
+        (("faq", 2), "Hostel rooms", "Ask about the campus tour"),
+    )
+    assert _ids(index.search("hostel")) == [2, 1]
+    assert _ids(index.search("tour")) == [1, 2]
+
+
+def test_rare_terms_and_short_documents_rank_higher():
+    index = _index(
+        (("faq", 1), "Fees", "Exam fees"),
+        (("faq", 2), "Fees", "Hostel fees"),
+        (("faq", 3), "Fees", "Library fees"),
+        (("faq", 4), "Fees", "Library fees fines overdue books returned late"),
+    )
+    # "fees" is in every document, so "exam" decides
+    assert _ids(index.search("fees exam"))[0] == 1
+    # Same term frequency; the shorter document wins
+    assert _ids(index.search("library")) == [3, 4]
+
+
+def test_filters_limit_and_stopwords():
+    index = _index(
+        (("course", 1), "Physics", "Mechanics and optics"),
+        (("faq", 2), "Physics lab", "Open on weekdays"),
+        (("faq", 3), "Physics tutors", "Book a session"),
+    )
+    assert _ids(index.search("physics", types={"course"})) == [1]
+    assert len(index.search("physics", limit=2)) == 2
+    assert index.search("the and of") == []
+
+
+def test_removed_documents_stop_counting_towards_scores():
+    index = _index(
+        (("faq", 1), "Hostel", "Rooms"),
+        (("faq", 2), "Hostel", "Rooms and meals"),
+        (("faq", 3), "Library", "Books"),
+    )
+    index.remove(("faq", 2))
+
+    fresh = _index((("faq", 1), "Hostel", "Rooms"), (("faq", 3), "Library", "Books"))
+    assert index.search("hostel") == fresh.search("hostel")
+    assert index.stats()["terms"] == fresh.stats()["terms"]
+
+
+def test_last_term_is_a_prefix_unless_followed_by_a_space():
+    index = _index(
+        (("faq", 1), "Admission deadlines", "When to apply"),
+        (("faq", 2), "Admissions office", "Where to ask"),
+    )
+
+    assert {hit["id"] for hit in index.search("admi")} == {1, 2}
+    assert {hit["id"] for hit in index.search("admission")} == {1, 2}
+    # A trailing space means the last word is complete
+    assert [hit["id"] for hit in index.search("admission ")] == [1]
+
+
+def test_local_writes_only_reload_their_own_table(sqlite_engine):
+    with Session(sqlite_engine) as db:
+        db.execute(insert(models.FAQ).values(question="Library hours", answer="Nine to five"))
+        db.execute(insert(models.Course).values(title="Physics", description="Mechanics", category="science"))
+        db.commit()
+
+        index = SearchIndex()
+        index.rebuild(db)
+        # Tables just built are checked once more, then settle
+        index.rebuild_if_stale(db)
+        index.rebuild_if_stale(db)
+        reloads = index.stats()["reloads"]
+
+        # Written without the ORM hooks, as another worker would
+        db.execute(insert(models.FAQ).values(question="Parking permits", answer="At the front desk"))
+        db.commit()
+        assert index.search("parking") == []
+
+        index.rebuild_if_stale(db)
+        assert [hit["title"] for hit in index.search("parking")] == ["Parking permits"]
+        assert index.stats()["reloads"] == reloads + 1
+        assert index.stats()["rebuilds"] == 1
+
+
+def test_edits_in_the_same_second_are_picked_up(sqlite_engine):
+    with Session(sqlite_engine) as db:
+        db.execute(insert(models.FAQ).values(question="Fees", answer="Paid per term"))
+        db.commit()
+        index = SearchIndex()
+        index.rebuild(db)
+
+        # Same row count, max id and updated_at as when the index was built
+        updated_at = db.query(models.FAQ.updated_at).scalar()
+        db.execute(update(models.FAQ).values(question="Tuition", updated_at=updated_at))
+        db.commit()
+
+        index.rebuild_if_stale(db)
+        assert [hit["title"] for hit in index.search("tuition")] == ["Tuition"]
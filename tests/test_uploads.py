@@ -0,0 +1,59 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from backend import uploads
+
+
+def _client(limit):
+    app = FastAPI()
+    app.add_middleware(uploads.UploadSizeLimit, path="/upload", limit=limit)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    @app.post("/other")
+    async def other(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return TestClient(app)
+
+
+def _multipart(payload: bytes):
+    boundary = "limit-test"
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="a.bin"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+    return body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+def _chunked(body: bytes, size: int = 1024):
+    # A generator body is sent without Content-Length
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def test_declared_length_over_the_limit_is_refused():
+    body, headers = _multipart(b"x" * 4096)
+    response = _client(limit=1024).post("/upload", content=body, headers=headers)
+    assert response.status_code == 413
+
+
+def test_chunked_body_is_cut_off_once_it_passes_the_limit():
+    client = _client(limit=1024)
+    body, headers = _multipart(b"x" * 4096)
+    response = client.post("/upload", content=_chunked(body), headers=headers)
+    assert response.status_code == 413
+
+    body, headers = _multipart(b"x" * 100)
+    response = client.post("/upload", content=_chunked(body), headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"size": 100}
+
+
+def test_other_paths_are_not_limited():
+    body, headers = _multipart(b"x" * 4096)
+    response = _client(limit=1024).post("/other", content=_chunked(body), headers=headers)
+    assert response.status_code == 200